@@ -0,0 +1,212 @@
+# Benchmarks for the Gujarati wordnet module
+#
+#   python bench.py                         run every benchmark, write bench-results.json
+#   python bench.py --skip-setup            reuse the indexes already built in --data-dir
+#   python bench.py --compare old.json      also report the change against an earlier run
+#
+# Workloads are fixed: words and synsets are drawn with a seeded generator from
+# the sorted word list, so two runs over the same data measure the same calls.
+
+import argparse
+import json
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import wnguj as wn
+
+SEED = 1234
+# the words and synsets demo.py exercises, always part of the workloads
+DEMO_WORDS = ['ઇલા', 'મહિલા', 'લગ્ન', 'શિવાલય', 'હસવું', 'વિલાપ_કરવો']
+DEMO_PAIRS = [(2954, 33884)]
+# (method, pos it is valid for)
+RELATIONS = [
+    ('hypernymy', ('NOUN', 'VERB')),
+    ('hypernymy(3)', ('NOUN', 'VERB')),
+    ('hyponymy', ('NOUN',)),
+    ('antonymy', ('NOUN', 'VERB', 'ADJECTIVE', 'ADVERB')),
+    ('meronymy', ('NOUN',)),
+    ('holonymy', ('NOUN',)),
+    ('entailment', ('VERB',)),
+    ('troponymy', ('VERB',)),
+]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def measure(name, calls, repeat=1):
+    '''Time every call of a workload and report throughput, latency and peak memory.
+
+    calls is a list of zero-argument callables. The workload is timed without
+    tracing first; the peak is taken from a second, traced pass.
+    '''
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for call in calls:
+            t0 = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - started
+
+    tracemalloc.start()
+    for call in calls:
+        call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    result = {
+        'calls': len(latencies),
+        'seconds': total,
+        'ops_per_sec': len(latencies) / total if total else None,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_bytes': peak,
+    }
+    print('{:<28} {:>8} calls {:>12.1f} ops/s  p50 {:>9.4f} ms  p99 {:>9.4f} ms  peak {:>10} B'.format(
+        name, result['calls'], result['ops_per_sec'] or 0, result['p50_ms'], result['p99_ms'], peak), flush=True)
+    return result
+
+
+def bench_setup(data_dir, runs):
+    results = {}
+    # setup() is incremental, force a full build to time the indexes themselves
+    results['setup'] = measure('setup', [lambda: wn.setup(data_dir, force=True)] * runs)
+    # and what a run over unchanged data costs, hashing the sources against the manifest
+    results['setup_noop'] = measure('setup (no-op)', [lambda: wn.setup(data_dir)] * runs)
+    return results
+
+
+def bench_lookups(data_dir, words, synset_names, cold_runs):
+    results = {}
+    # cold: a fresh handle per call, so every call pays for loading the indexes
+    results['synsets_cold'] = measure(
+        'synsets (cold)', [lambda w=w: wn.GujaratiWordNet(data_dir).synsets(w) for w in words[:cold_runs]])
+    results['synset_cold'] = measure(
+        'synset (cold)', [lambda n=n: wn.GujaratiWordNet(data_dir).synset(n) for n in synset_names[:cold_runs]])
+
+    wordnet = wn.GujaratiWordNet(data_dir)
+    wordnet.synsets(words[0])
+    results['synsets_warm'] = measure('synsets (warm)', [lambda w=w: wordnet.synsets(w) for w in words], repeat=3)
+    results['synset_warm'] = measure('synset (warm)', [lambda n=n: wordnet.synset(n) for n in synset_names], repeat=3)
+    return results
+
+
+def bench_relations(wordnet, synsets_by_pos):
+    results = {}
+    for method, valid_pos in RELATIONS:
+        targets = [ss for pos in valid_pos for ss in synsets_by_pos.get(pos, [])]
+        if method == 'hypernymy(3)':
+            calls = [lambda ss=ss: ss.hypernymy(3) for ss in targets]
+        else:
+            calls = [getattr(ss, method) for ss in targets]
+        # the first pass loads the relation tables, time the steady state after it
+        for call in calls:
+            call()
+        results[method] = measure(method, calls, repeat=3)
+    return results
+
+
+def bench_similarity(wordnet, pairs):
+    results = {}
+    for name, function in wn.SIMILARITY_MEASURES.items():
+        calls = [lambda a=a, b=b: function(a, b) for a, b in pairs]
+        for call in calls:
+            call()
+        results['similarity_' + name] = measure('similarity_' + name, calls, repeat=3)
+    return results
+
+
+def workloads(wordnet, samples):
+    rng = random.Random(SEED)
+    vocabulary = sorted(wordnet._words())
+    words = [w for w in DEMO_WORDS if w in wordnet._words()] + rng.sample(vocabulary, min(samples, len(vocabulary)))
+
+    synsets_by_pos = {}
+    seen = set()
+    for _, found in wordnet.iter_synsets(words):
+        for ss in found:
+            if ss.synset_id() not in seen:
+                seen.add(ss.synset_id())
+                synsets_by_pos.setdefault(ss.pos(), []).append(ss)
+    synset_names = ['{}.{}.{}'.format(ss.head_word(), ss.pos(), ss.synset_id())
+                    for found in synsets_by_pos.values() for ss in found]
+    rng.shuffle(synset_names)
+
+    # realistic pairs: senses of the same pos, as word_similarity() would pair them
+    pairs = [(wordnet._make_synset(a), wordnet._make_synset(b)) for a, b in DEMO_PAIRS]
+    pairs = [(a, b) for a, b in pairs if a is not None and b is not None]
+    nouns = synsets_by_pos.get('NOUN', [])
+    pairs += [(rng.choice(nouns), rng.choice(nouns)) for _ in range(samples)] if nouns else []
+    return words, synset_names, synsets_by_pos, pairs
+
+
+def compare(results, baseline_file, threshold):
+    with open(baseline_file, encoding='utf8') as infile:
+        baseline = json.load(infile)['benchmarks']
+    regressions = []
+    print('\n{:<28} {:>12} {:>12} {:>8}'.format('benchmark', 'p50 before', 'p50 after', 'change'))
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before or not before.get('p50_ms'):
+            continue
+        change = result['p50_ms'] / before['p50_ms'] - 1
+        print('{:<28} {:>12.4f} {:>12.4f} {:>+7.1%}'.format(name, before['p50_ms'], result['p50_ms'], change))
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Gujarati wordnet module.')
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--output', default='bench-results.json')
+    parser.add_argument('--samples', type=int, default=1000, help='words and similarity pairs per workload')
+    parser.add_argument('--cold-runs', type=int, default=5, help='fresh handles timed for the cold lookups')
+    parser.add_argument('--setup-runs', type=int, default=1)
+    parser.add_argument('--skip-setup', action='store_true')
+    parser.add_argument('--compare', help='an earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='p50 slowdown reported as a regression')
+    args = parser.parse_args(argv)
+
+    results = {}
+    if not args.skip_setup:
+        results.update(bench_setup(args.data_dir, args.setup_runs))
+
+    wordnet = wn.GujaratiWordNet(args.data_dir)
+    words, synset_names, synsets_by_pos, pairs = workloads(wordnet, args.samples)
+    results.update(bench_lookups(args.data_dir, words, synset_names, args.cold_runs))
+    results.update(bench_relations(wordnet, synsets_by_pos))
+    results.update(bench_similarity(wordnet, pairs))
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': SEED,
+        'samples': args.samples,
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024),
+        'benchmarks': results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2), encoding='utf8')
+    print('\nWrote {}'.format(args.output))
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print('Regressions over {:.0%}: {}'.format(args.threshold, ', '.join(regressions)))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
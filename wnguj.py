@@ -2,69 +2,1013 @@ import pickle
 import csv
 import sys
 import math
+import mmap
+import bisect
+import struct
+import unicodedata
+import threading
+import os
+import heapq
+import json
+import re
+import hashlib
+import zlib
+import time
+import random
+import sqlite3
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from collections.abc import Mapping
 from pathlib import Path
 
 
 
-def setup():
-    # from Guj 'word' :[synset_ids] dictionary dump
+def setup(data_dir='.', force=False, database=False):
+    '''Build the indexes of a data directory and return the paths that were rebuilt.
+
+    Size, mtime and SHA-256 of every source are recorded in index_manifest.json.
+    An index is rebuilt only when one of its sources changed or its file is
+    missing, so a second run over unchanged data does no work. force rebuilds
+    everything. database also builds the SQLite database read by
+    GujaratiWordNet(backend='sqlite').
+    '''
+    if _stats_enabled:
+        _count_call('setup')
+    with span('setup', data_dir=str(data_dir)):
+        rebuilt = _setup(Path(data_dir), force, database)
+    # indexes already loaded by the default handle are stale now
+    if rebuilt and _default_wordnet is not None:
+        _default_wordnet.close()
+    return rebuilt
+
+
+WORDS_FILENAME = 'words_synid_mapping_dump'
+MANIFEST_FILENAME = 'index_manifest.json'
+# one pickle per relation table, {synset_id: (target_id, ...)}
+RELATION_INDEX_DIRNAME = 'relation_index'
+# raised whenever the layout or content of an index changes, every index is then built again
+_MANIFEST_VERSION = 2
+# sources are read and hashed this many bytes at a time
+_BULK_READ = 1 << 20
+
+
+def _index_builds(data_dir, database=False):
+    # (index file, source files, build function), paths relative to data_dir
+    # build(*sources, destination) is called with absolute paths
+    builds = [
+        (WORDS_FILENAME, ('gujarati_words.csv',), _build_words_dump),
+        (SYNSET_STORE_FILENAME, ('tbl_all_gujarati_synset_data.csv',), compile_synset_store),
+        (DELETION_INDEX_FILENAME, ('gujarati_words.csv',), compile_deletion_index),
+    ]
+    for source in sorted((data_dir / 'relations').glob('tbl_*.csv')):
+        if _relation_target_column(source) is not None:
+            builds.append(('{}/{}.pickle'.format(RELATION_INDEX_DIRNAME, source.stem),
+                           ('relations/' + source.name,), compile_relation_table))
+    for pos in WORDNET_POS:
+        sources = _link_sources(data_dir, pos)
+        if sources:
+            builds.append(('{}/links_{}.pickle'.format(RELATION_INDEX_DIRNAME, pos),
+                           tuple('relations/' + source.name for source in sources), compile_links))
+    builds.append((IC_FILENAME, _IC_SOURCES, compile_information_content))
+    for extended, output in GLOSS_INDEX_FILENAMES.items():
+        builds.append((output, _gloss_index_sources(extended), compile_gloss_index))
+    if database:
+        relation_sources = tuple(sources[0] for output, sources, build in builds
+                                 if build is compile_relation_table)
+        builds.append((DATABASE_FILENAME, ('gujarati_words.csv', 'tbl_all_gujarati_synset_data.csv')
+                       + tuple('relations/{}.csv'.format(stem) for stem in _DATABASE_RAW_TABLES) + relation_sources,
+                       compile_database))
+    return builds
+
+
+def _is_fresh(compiled, *sources):
+    # a compiled index is used unless one of its sources was edited after it was built
+    if not compiled.exists():
+        return False
+    built = compiled.stat().st_mtime_ns
+    return all(not source.exists() or source.stat().st_mtime_ns <= built for source in sources)
+
+
+def _fingerprint(filename, previous=None):
+    stat = os.stat(filename)
+    # an untouched file keeps its recorded hash, anything else is hashed again
+    if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+        return previous
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(_BULK_READ), b''):
+            digest.update(chunk)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+
+
+def _write_manifest(filename, indexes):
+    with open(str(filename) + '.tmp', 'w', encoding='utf8') as outfile:
+        json.dump({'version': _MANIFEST_VERSION, 'indexes': indexes}, outfile, indent=1, sort_keys=True)
+    os.replace(str(filename) + '.tmp', filename)
+
+
+def _setup(data_dir, force, database):
+    manifest_file = data_dir / MANIFEST_FILENAME
+    previous = {}
+    if not force and manifest_file.exists():
+        with open(manifest_file, encoding='utf8') as infile:
+            manifest = json.load(infile)
+        if manifest.get('version') == _MANIFEST_VERSION:
+            previous = manifest['indexes']
+    (data_dir / RELATION_INDEX_DIRNAME).mkdir(exist_ok=True)
+
+    indexes = {}
+    rebuilt = []
+    completed = False
+    try:
+        for output, sources, build in _index_builds(data_dir, database):
+            old = previous.get(output, {}).get('sources', {})
+            fingerprints = {source: _fingerprint(data_dir / source, old.get(source)) for source in sources}
+            destination = data_dir / output
+            changed = any(old.get(source, {}).get('sha256') != fingerprint['sha256']
+                          for source, fingerprint in fingerprints.items())
+            if changed or not destination.exists():
+                # built aside and swapped in, a reader never sees half an index
+                build(*(data_dir / source for source in sources), str(destination) + '.tmp')
+                os.replace(str(destination) + '.tmp', destination)
+                rebuilt.append(destination)
+            elif destination.stat().st_mtime_ns < max(fingerprint['mtime_ns'] for fingerprint in fingerprints.values()):
+                # same content under a newer mtime (a checkout or a copy), a reader going by mtimes
+                # would take the index for stale and parse the sources again
+                os.utime(destination)
+            indexes[output] = {'sources': fingerprints}
+        completed = True
+    finally:
+        if completed:
+            for output in previous.keys() - indexes.keys():
+                if all((data_dir / source).exists() for source in previous[output]['sources']):
+                    # not asked for this time (the database), checked again when it is
+                    indexes[output] = previous[output]
+                else:
+                    # compiled tables whose source is gone
+                    (data_dir / output).unlink(missing_ok=True)
+            _write_manifest(manifest_file, indexes)
+        else:
+            # keep what finished, the rest is rebuilt or checked on the next run
+            _write_manifest(manifest_file, dict(previous, **indexes))
+    return rebuilt
+
+
+def _build_words_dump(source, destination):
+    # serializing the words dictionary
+    # protocol 4 as the dump shipped in the repository, rebuilding it leaves that file unchanged
+    words = build_words_mapping(source)
+    with open(destination, 'wb') as outfile:
+        pickle.dump(words, outfile, protocol=4)
+
+
+def _relation_target_column(source):
+    # index of the target id column of a relation table, None for any other table
+    # target is the first '<relation>_id' column, antonymy and gradation tables carry words in between
+    with open(source, encoding='utf8') as reader:
+        header = next(csv.reader(reader), None)
+    if not header or header[0] != 'synset_id':
+        return None
+    for column, name in enumerate(header[1:], 1):
+        if name.endswith('_id'):
+            return column
+    return None
+
+
+def _read_relation_table(source):
+    # {source synset_id: (target synset_id, ...)}
+    column = _relation_target_column(source)
+    adjacency = {}
+    rows = 0
+    with span('load_relations', table=Path(source).stem), \
+            open(source, encoding='utf8', buffering=_BULK_READ) as reader:
+        csv_reader = csv.reader(reader, delimiter=',')
+        next(csv_reader)
+        # antonymy tables repeat a pair once per word pair, keep each target once
+        for line in csv_reader:
+            rows += 1
+            adjacency.setdefault(int(line[0].strip()), {})[int(line[column])] = None
+        if _stats_enabled:
+            _count_file(reader, rows)
+    return {synset_id: tuple(targets) for synset_id, targets in adjacency.items()}
+
+
+def compile_relation_table(source, destination):
+    table = _read_relation_table(source)
+    with open(destination, 'wb') as outfile:
+        pickle.dump(table, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+WORDNET_POS = ('noun', 'verb', 'adjective', 'adverb')
+
+
+def _link_sources(data_dir, pos):
+    # the link manifest shipped for a pos, or every relation table of the pos when there is none
+    relations_dir = Path(data_dir) / 'relations'
+    manifest = relations_dir / 'tbl_{}_relations.csv'.format(pos)
+    if manifest.exists():
+        return [manifest]
+    return [source for source in sorted(relations_dir.glob('tbl_{}_*.csv'.format(pos)))
+            if _relation_target_column(source) is not None]
+
+
+def _read_links(sources):
+    # {synset_id: frozenset of the link types it has}, a link type is a table name without 'tbl_<pos>_'
+    # Eg: {
+    #   1: frozenset({'onto_nodes', 'anto_quality', 'modifies_noun'}),
+    #    ...
+    # }
+    links = {}
+    for source in sources:
+        source = Path(source)
+        if source.stem.endswith('_relations'):
+            with open(source, encoding='utf8') as reader:
+                csv_reader = csv.reader(reader, delimiter=',')
+                next(csv_reader)
+                for row in csv_reader:
+                    links.setdefault(int(row[0]), set()).add(sys.intern(row[1]))
+        else:
+            link_type = sys.intern(source.stem.split('_', 2)[2])
+            for synset_id in _read_relation_table(source):
+                links.setdefault(synset_id, set()).add(link_type)
+    return {synset_id: frozenset(types) for synset_id, types in links.items()}
+
+
+def compile_links(*sources_and_destination):
+    sources, destination = sources_and_destination[:-1], sources_and_destination[-1]
+    links = _read_links(sources)
+    with open(destination, 'wb') as outfile:
+        pickle.dump(links, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _csv_rows(source):
+    # rows of a csv table after its header
+    rows = 0
+    with open(source, encoding='utf8', buffering=_BULK_READ) as reader:
+        csv_reader = csv.reader(reader, delimiter=',')
+        next(csv_reader, None)
+        for row in csv_reader:
+            rows += 1
+            yield row
+        if _stats_enabled:
+            _count_file(reader, rows)
+
+
+def _read_sense_counts(rows):
+    # {word: {pos: number of senses}} from the rows of tbl_sense_count
+    # the table lists the Hindi words, keyed here by their Gujarati spelling
+    index = {}
+    with span('load_sense_counts'):
+        for word, sense_count, pos in rows:
+            word = _to_gujarati(word.strip()).replace(' ', '_')
+            index.setdefault(word, {})[sys.intern(pos.upper())] = int(sense_count)
+    return index
+
+
+# information content of every synset in the noun and verb hypernym hierarchies
+IC_FILENAME = 'information_content_dump'
+_IC_SOURCES = ('gujarati_words.csv', 'relations/tbl_sense_count.csv',
+               'relations/tbl_noun_hypernymy.csv', 'relations/tbl_verb_hypernymy.csv')
+
+
+def compile_information_content(words_source, sense_count_source, noun_hypernymy_source, verb_hypernymy_source,
+                                destination):
+    ic = _information_content(build_words_mapping(words_source), _read_sense_counts(_csv_rows(sense_count_source)),
+                              {'NOUN': _read_relation_table(noun_hypernymy_source),
+                               'VERB': _read_relation_table(verb_hypernymy_source)})
+    with open(destination, 'wb') as outfile:
+        pickle.dump(ic, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _information_content(words, sense_counts, hypernymy):
+    # {pos: {synset_id: -log p(synset)}}
+    # a word adds 1/(its number of senses) to each of its synsets, and a synset's
+    # probability is the share of the pos total falling on it or anything below it
+    # Eg: {
+    #   'NOUN': {73: 0.0, 3259: 0.41, ..., 2954: 7.9, ...},
+    #   'VERB': {0: 0.0, ...},
+    # }
+    ic = {}
+    with span('information_content'):
+        for pos, parents in hypernymy.items():
+            freq = {}
+            for word, postings in words.items():
+                senses = [synset_id for synset_id, synset_pos in postings if synset_pos == pos]
+                if not senses:
+                    continue
+                # words missing from tbl_sense_count fall back to their own number of senses
+                count = sense_counts.get(word, {}).get(pos) or len(senses)
+                for synset_id in senses:
+                    freq[synset_id] = freq.get(synset_id, 0.0) + 1.0 / count
+            cumulative = {}
+            virtual_root = HYPERNYM_ROOTS[pos] == 0
+            for synset_id, value in freq.items():
+                # every ancestor once, however many paths lead to it
+                for ancestor in _ancestor_map(parents, synset_id, virtual_root):
+                    cumulative[ancestor] = cumulative.get(ancestor, 0.0) + value
+            total = sum(freq.values())
+            ic[pos] = {synset_id: math.log(total / value) for synset_id, value in cumulative.items()}
+    return ic
+
+
+def build_words_mapping(source):
+    # from Guj 'word' :[(synset_id, pos)] dictionary dump
 # from gujarati_words table we create dictionary where in key is word and value is list of synset_ids it belongs to
+# with the pos of each, so pos-restricted lookups never touch the other senses
 # Eg: {
-#   'મહાદેવ':[5,2061],
+#   'મહાદેવ':[(5, 'NOUN'), (2061, 'NOUN')],
 #    ...
 # }
     words = {}
-    with open('gujarati_words.csv', encoding='utf8') as csv_file:
+    rows = 0
+    with span('build_words_mapping'), open(source, encoding='utf8', buffering=_BULK_READ) as csv_file:
         csv_reader = csv.reader(csv_file, delimiter=',')
-        line_count = 0
+        next(csv_reader)
         for row in csv_reader:
-            if line_count == 0:
-
-                line_count += 1
+            rows += 1
+            s = str(row[0])
+            s = s.strip()
+            # a handful of rows carry 'null' for the pos
+            pos = sys.intern(row[2]) if row[2] != 'null' else None
+
+            if s in words:
+                words[s].append((int(row[1]), pos))
             else:
-                line_count += 1
-                s = str(row[0])
-                s = s.strip()
+                words[s] = []
+                words[s].append((int(row[1]), pos))
+        if _stats_enabled:
+            _count_file(csv_file, rows)
+    return words
+
+
+# compiled synset store, written by setup() and memory-mapped on first lookup
+# layout (native byte order, all integers uint32):
+#   magic (8 bytes) | record count n | byte order flag
+#   synset ids, sorted          n entries
+#   field offsets           4*n+1 entries, fields of record i are
+#                                  lemmas, gloss, examples, pos at 4*i .. 4*i+3
+#   utf-8 field data
+SYNSET_STORE_FILENAME = 'synset_data_store'
+_STORE_MAGIC = b'WNGUJSS1'
+_STORE_HEADER = struct.Struct('=8sII')
+_STORE_FIELDS = 4
+
+
+def _read_synset_records(source):
+    # [(synset_id, lemmas, gloss, examples, pos), ...] by synset_id
+    records = []
+    for syn_data in _csv_rows(source):
+        if not syn_data or syn_data[0] == '':
+            continue
+        # the concept, then the examples, which a few rows split further with ';'
+        gloss = syn_data[3].split(';')
+        records.append((int(syn_data[0]), syn_data[2], gloss[0], ';'.join(gloss[1:]), syn_data[-1]))
+    records.sort()
+    return records
+
+
+def compile_synset_store(source, destination):
+    with span('compile_synset_store'):
+        records = _read_synset_records(source)
+
+    ids = array('I', (record[0] for record in records))
+    offsets = array('I')
+    data = bytearray()
+    base = _STORE_HEADER.size + ids.itemsize * (len(ids) + _STORE_FIELDS * len(records) + 1)
+    for record in records:
+        for field in record[1:]:
+            offsets.append(base + len(data))
+            data += field.encode('utf8')
+    offsets.append(base + len(data))
+
+    with open(destination, 'wb') as outfile:
+        outfile.write(_STORE_HEADER.pack(_STORE_MAGIC, len(records), sys.byteorder == 'little'))
+        ids.tofile(outfile)
+        offsets.tofile(outfile)
+        outfile.write(data)
+
+
+class SynsetStore:
+    '''Read-only view over a compiled synset store.'''
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as infile:
+            self._map = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        if _stats_enabled:
+            # pages are faulted in on demand, bytes are counted per record read
+            _count_io(files_opened=1)
+        magic, count, little_endian = _STORE_HEADER.unpack_from(self._map)
+        if magic != _STORE_MAGIC or little_endian != (sys.byteorder == 'little'):
+            raise IndoWordNetError('{} is not a synset store for this platform, run setup() again.'.format(filename))
+        view = memoryview(self._map)
+        start = _STORE_HEADER.size
+        self._ids = view[start:start + 4 * count].cast('I')
+        start += 4 * count
+        self._offsets = view[start:start + 4 * (_STORE_FIELDS * count + 1)].cast('I')
+        self._view = view
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __contains__(self, synset_id):
+        return self._index(synset_id) is not None
+
+    def _index(self, synset_id):
+        i = bisect.bisect_left(self._ids, synset_id)
+        if i < len(self._ids) and self._ids[i] == synset_id:
+            return i
+        return None
+
+    def record(self, synset_id):
+        '''Return (lemmas, gloss, examples, pos) of a synset, or None if it is not in the store.'''
+        i = self._index(synset_id)
+        if i is None:
+            return None
+        offsets, view = self._offsets, self._view
+        first = _STORE_FIELDS * i
+        if _stats_enabled:
+            _count_io(bytes_read=offsets[first + _STORE_FIELDS] - offsets[first], records_parsed=1)
+        return tuple(str(view[offsets[j]:offsets[j + 1]], 'utf8') for j in range(first, first + _STORE_FIELDS))
+
+
+# inverted indexes of gloss and example tokens for disambiguate(), the plain one and
+# the extended one, which also files each synset under its hypernyms' and hyponyms' tokens
+GLOSS_INDEX_FILENAMES = {False: 'gloss_index', True: 'gloss_index_extended'}
+
+
+def _gloss_index_sources(extended):
+    sources = ('tbl_all_gujarati_synset_data.csv',)
+    if extended:
+        sources += tuple('relations/tbl_{}_{}.csv'.format(pos.lower(), relation)
+                         for pos, relations in _LESK_NEIGHBOUR_RELATIONS.items() for relation in relations)
+    return sources
+
+
+def compile_gloss_index(synset_source, *sources_and_destination):
+    # the relation tables follow _LESK_NEIGHBOUR_RELATIONS, as listed by _gloss_index_sources
+    *relation_sources, destination = sources_and_destination
+    neighbours = None
+    if relation_sources:
+        tables = iter(relation_sources)
+        neighbours = {pos: [_read_relation_table(next(tables)) for relation in relations]
+                      for pos, relations in _LESK_NEIGHBOUR_RELATIONS.items()}
+    index = _gloss_index(_read_synset_records(synset_source), neighbours)
+    with open(destination, 'wb') as outfile:
+        pickle.dump(index, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _gloss_index(records, neighbours=None):
+    # inverted index from gloss and example tokens to the synsets using them
+    # Eg: {
+    #   'સ્ત્રી': (5.2, frozenset({2954, 33884, ...})),
+    #    ...
+    # }
+    # the weight is the token's idf over the plain glosses, with neighbours
+    # ({pos: [relation table, ...]}) each synset is also filed under the tokens of its neighbours
+    with span('build_gloss_index', extended=neighbours is not None):
+        signatures = {}
+        pos_of = {}
+        for synset_id, lemmas, gloss, examples, pos in records:
+            signatures[synset_id] = set(_tokenize(gloss)) | set(_tokenize(examples))
+            pos_of[synset_id] = pos
+        frequency = {}
+        for signature in signatures.values():
+            for token in signature:
+                frequency[token] = frequency.get(token, 0) + 1
+        weights = {token: math.log(len(signatures) / df) for token, df in frequency.items()}
+        if neighbours is not None:
+            signatures = {synset_id: signature.union(*(
+                              signatures[i] for table in neighbours.get(pos_of[synset_id], ())
+                              for i in table.get(synset_id, ()) if i in signatures))
+                          for synset_id, signature in signatures.items()}
+        postings = {}
+        for synset_id, signature in signatures.items():
+            for token in signature:
+                postings.setdefault(token, []).append(synset_id)
+        return {token: (weights[token], frozenset(ids)) for token, ids in postings.items()}
+
+
+# SQLite database, written by setup(database=True) for GujaratiWordNet(backend='sqlite')
+#   lemma(word, synset_id, pos)                      gujarati_words.csv, in file order
+#   synset(synset_id, lemmas, gloss, examples, pos)  the synset data, as in the synset store
+#   relation(tbl, synset_id, target_id, seq)         every relation table, seq keeps the target order
+#   relation_table(name)                             the relation tables loaded, empty ones included
+#   information_content(pos, synset_id, ic)
+#   tbl_morph_rules, tbl_sense_count,
+#   tbl_onto_data, tbl_onto_map                      copied as they are, columns named as in the csv
+DATABASE_FILENAME = 'wnguj.sqlite3'
+_DATABASE_RAW_TABLES = ('tbl_morph_rules', 'tbl_sense_count', 'tbl_onto_data', 'tbl_onto_map')
+_DATABASE_SCHEMA = """
+CREATE TABLE lemma (word TEXT NOT NULL, synset_id INTEGER NOT NULL, pos TEXT);
+CREATE TABLE synset (synset_id INTEGER PRIMARY KEY, lemmas TEXT, gloss TEXT, examples TEXT, pos TEXT);
+CREATE TABLE relation (tbl TEXT NOT NULL, synset_id INTEGER NOT NULL, target_id INTEGER NOT NULL, seq INTEGER NOT NULL);
+CREATE TABLE relation_table (name TEXT PRIMARY KEY);
+CREATE TABLE information_content (pos TEXT NOT NULL, synset_id INTEGER NOT NULL, ic REAL NOT NULL,
+                                  PRIMARY KEY (pos, synset_id));
+"""
+# created after the rows are in, covering so a lookup never reads the table itself
+_DATABASE_INDEXES = """
+CREATE INDEX lemma_word_pos ON lemma (word, pos, synset_id);
+CREATE INDEX relation_synset ON relation (synset_id, tbl, seq, target_id);
+CREATE INDEX relation_tbl ON relation (tbl, synset_id, seq, target_id);
+"""
+
+
+def _quote(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def compile_database(words_source, synset_source, *sources_and_destination):
+    sources, destination = [Path(source) for source in sources_and_destination[:-1]], sources_and_destination[-1]
+    by_stem = {source.stem: source for source in sources}
+    Path(destination).unlink(missing_ok=True)
+    connection = sqlite3.connect(destination)
+    try:
+        with span('compile_database'), connection:
+            connection.executescript(_DATABASE_SCHEMA)
+            words = build_words_mapping(words_source)
+            connection.executemany('INSERT INTO lemma VALUES (?, ?, ?)',
+                                   ((word, synset_id, pos) for word, postings in words.items()
+                                    for synset_id, pos in postings))
+            connection.executemany('INSERT INTO synset VALUES (?, ?, ?, ?, ?)', _read_synset_records(synset_source))
+
+            tables = {}
+            for source in sources:
+                if source.stem in _DATABASE_RAW_TABLES:
+                    with open(source, encoding='utf8') as reader:
+                        header = next(csv.reader(reader), [])
+                    connection.execute('CREATE TABLE {} ({})'.format(
+                        _quote(source.stem), ', '.join(_quote(column) for column in header)))
+                    connection.executemany('INSERT INTO {} VALUES ({})'.format(
+                        _quote(source.stem), ', '.join('?' * len(header))), _csv_rows(source))
+                    continue
+                table = tables[source.stem] = _read_relation_table(source)
+                connection.execute('INSERT INTO relation_table VALUES (?)', (source.stem,))
+                connection.executemany('INSERT INTO relation VALUES (?, ?, ?, ?)',
+                                       ((source.stem, synset_id, target, seq) for synset_id, targets in table.items()
+                                        for seq, target in enumerate(targets)))
+
+            hypernymy = {pos: tables['tbl_{}_hypernymy'.format(pos.lower())] for pos in HYPERNYM_ROOTS
+                         if 'tbl_{}_hypernymy'.format(pos.lower()) in tables}
+            if 'tbl_sense_count' in by_stem:
+                ic = _information_content(words, _read_sense_counts(_csv_rows(by_stem['tbl_sense_count'])), hypernymy)
+                connection.executemany('INSERT INTO information_content VALUES (?, ?, ?)',
+                                       ((pos, synset_id, value) for pos, table in ic.items()
+                                        for synset_id, value in table.items()))
+            connection.executescript(_DATABASE_INDEXES)
+            connection.execute('ANALYZE')
+    finally:
+        connection.close()
+
+
+class _Database:
+    '''Read-only connections to a compiled database, one per thread and process.'''
+
+    def __init__(self, filename):
+        if not Path(filename).exists():
+            raise IndoWordNetError('{} does not exist, run setup(database=True) first.'.format(filename))
+        # setup() only ever swaps in a new file, the one opened is never written again, so readers
+        # need no locks, journal or shared-memory file, and a read-only directory will do
+        self._uri = Path(filename).resolve().as_uri() + '?mode=ro&immutable=1'
+        self._local = threading.local()
+
+    def connection(self):
+        local = self._local
+        # a forked child must not share its parent's connection
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+            local.pid = os.getpid()
+            if _stats_enabled:
+                _count_io(files_opened=1)
+        return local.connection
+
+    def query(self, sql, parameters=()):
+        rows = self.connection().execute(sql, parameters).fetchall()
+        if _stats_enabled:
+            _count_io(records_parsed=len(rows))
+        return rows
+
+
+class _DatabaseStore:
+    '''The synset table, read the way SynsetStore is.'''
+
+    def __init__(self, database):
+        self._database = database
+
+    def __len__(self):
+        return self._database.query('SELECT count(*) FROM synset')[0][0]
+
+    def __iter__(self):
+        return (row[0] for row in self._database.query('SELECT synset_id FROM synset ORDER BY synset_id'))
+
+    def __contains__(self, synset_id):
+        return bool(self._database.query('SELECT 1 FROM synset WHERE synset_id = ?', (synset_id,)))
+
+    def record(self, synset_id):
+        '''Return (lemmas, gloss, examples, pos) of a synset, or None if it is not in the database.'''
+        rows = self._database.query('SELECT lemmas, gloss, examples, pos FROM synset WHERE synset_id = ?',
+                                    (synset_id,))
+        return rows[0] if rows else None
+
+
+class _DatabaseLemmas(Mapping):
+    '''The lemma table as the words mapping, {word: [(synset_id, pos), ...]}.'''
+
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, word):
+        postings = self._database.query('SELECT synset_id, pos FROM lemma WHERE word = ? ORDER BY rowid', (word,))
+        if not postings:
+            raise KeyError(word)
+        return postings
+
+    def __contains__(self, word):
+        return bool(self._database.query('SELECT 1 FROM lemma WHERE word = ? LIMIT 1', (word,)))
+
+    def __iter__(self):
+        return (row[0] for row in self._database.query('SELECT DISTINCT word FROM lemma'))
+
+    def __len__(self):
+        return self._database.query('SELECT count(DISTINCT word) FROM lemma')[0][0]
+
+
+class _DatabaseTable(Mapping):
+    '''One relation table as {synset_id: (target synset_id, ...)}, queried one synset at a time.'''
+
+    def __init__(self, database, stem):
+        self._database = database
+        self._stem = stem
+        self._targets = {}
+        self._table = None
+
+    def __getitem__(self, synset_id):
+        if self._table is not None:
+            return self._table[synset_id]
+        targets = self._targets.get(synset_id)
+        if targets is None:
+            targets = self._targets[synset_id] = tuple(row[0] for row in self._database.query(
+                'SELECT target_id FROM relation WHERE synset_id = ? AND tbl = ? ORDER BY seq',
+                (synset_id, self._stem)))
+        if not targets:
+            raise KeyError(synset_id)
+        return targets
+
+    def _load(self):
+        # iterating needs every source, the whole table is read once
+        if self._table is None:
+            table = {}
+            with span('load_relations', table=self._stem):
+                for synset_id, target in self._database.query(
+                        'SELECT synset_id, target_id FROM relation WHERE tbl = ? ORDER BY synset_id, seq',
+                        (self._stem,)):
+                    table.setdefault(synset_id, []).append(target)
+            self._table = {synset_id: tuple(targets) for synset_id, targets in table.items()}
+        return self._table
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+
+# compiled deletion index for fuzzy_search(), written by setup() and memory-mapped on first use
+# layout (native byte order):
+#   magic (8 bytes) | max edits | lemma index bits | deletion count bits | lemma count n (uint32) | entry count m (uint64)
+#   entries, sorted           m int64, crc32 of a variant << (index bits + count bits)
+#                                      | its number of deletions << index bits | lemma index
+#   lemma offsets          n+1 uint32, into the lemma data
+#   utf-8 lemma data, lemmas in code point order
+DELETION_INDEX_FILENAME = 'deletion_index'
+# edits the compiled index answers, larger max_edits build one in memory
+FUZZY_INDEX_EDITS = 2
+_DELETES_MAGIC = b'WNGUJDI1'
+_DELETES_HEADER = struct.Struct('=8sIIIIQ')
+
+
+def _delete_key(variant):
+    # stable across processes, unlike hash(), so the index can be compiled ahead
+    return zlib.crc32(variant.encode('utf8'))
+
+
+def _pack_deletions(lemmas, max_edits):
+    index_bits = max(1, len(lemmas).bit_length())
+    count_bits = max(1, max_edits.bit_length())
+    packed = []
+    for i, lemma in enumerate(lemmas):
+        for variant, deletions in _deletions(lemma, max_edits).items():
+            packed.append((_delete_key(variant) << (index_bits + count_bits)) | (deletions << index_bits) | i)
+    packed.sort()
+    return index_bits, count_bits, array('q', packed)
+
+
+def compile_deletion_index(source, destination):
+    with span('compile_deletion_index'):
+        lemmas = sorted(build_words_mapping(source))
+        index_bits, count_bits, entries = _pack_deletions(lemmas, FUZZY_INDEX_EDITS)
+    data = [lemma.encode('utf8') for lemma in lemmas]
+    offsets = array('I', [0])
+    for encoded in data:
+        offsets.append(offsets[-1] + len(encoded))
+    with open(destination, 'wb') as outfile:
+        outfile.write(_DELETES_HEADER.pack(_DELETES_MAGIC, FUZZY_INDEX_EDITS, index_bits, count_bits,
+                                           len(lemmas), len(entries)))
+        entries.tofile(outfile)
+        offsets.tofile(outfile)
+        outfile.write(b''.join(data))
+
+
+class _DeletionIndex:
+    # symmetric delete index: every string reachable from a lemma by up to max_edits deletions,
+    # looked up by the crc32 of the variant, with the fewest deletions reaching it
+
+    def __init__(self, max_edits, index_bits, count_bits, entries, lemmas):
+        self.max_edits = max_edits
+        self._index_bits = index_bits
+        self._count_bits = count_bits
+        self._entries = entries
+        self.lemmas = lemmas
+
+    @classmethod
+    def build(cls, lemmas, max_edits):
+        return cls(max_edits, *_pack_deletions(lemmas, max_edits), lemmas)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'rb') as infile:
+            mapped = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        if _stats_enabled:
+            _count_io(files_opened=1)
+        magic, max_edits, index_bits, count_bits, n, m = _DELETES_HEADER.unpack_from(mapped)
+        if magic != _DELETES_MAGIC:
+            raise IndoWordNetError('{} is not a deletion index, run setup() again.'.format(filename))
+        view = memoryview(mapped)
+        start = _DELETES_HEADER.size
+        entries = view[start:start + 8 * m].cast('q')
+        start += 8 * m
+        offsets = view[start:start + 4 * (n + 1)].cast('I')
+        data = view[start + 4 * (n + 1):]
+        lemmas = _MappedStrings(offsets, data)
+        return cls(max_edits, index_bits, count_bits, entries, lemmas)
+
+    def lemma(self, i):
+        return self.lemmas[i]
+
+    def candidates(self, word, max_edits):
+        # indexes of the lemmas sharing a variant with word, each within max_edits deletions
+        entries = self._entries
+        shift = self._index_bits + self._count_bits
+        index_mask = (1 << self._index_bits) - 1
+        count_mask = (1 << self._count_bits) - 1
+        found = set()
+        for variant in _deletions(word, max_edits):
+            low = _delete_key(variant) << shift
+            i = bisect.bisect_left(entries, low)
+            while i < len(entries) and entries[i] < low + (1 << shift):
+                entry = entries[i]
+                if (entry >> self._index_bits) & count_mask <= max_edits:
+                    found.add(entry & index_mask)
+                i += 1
+        return found
+
+
+class _MappedStrings:
+    # utf-8 strings of a mapped file by position, decoded as they are read
+
+    def __init__(self, offsets, data):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self._data[self._offsets[i]:self._offsets[i + 1]], 'utf8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+# default number of synsets kept by the identity cache of a GujaratiWordNet handle
+DEFAULT_CACHE_SIZE = 100000
+
+# number of tokens iter_synsets() resolves together
+DEFAULT_WINDOW = 4096
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize', 'nbytes'])
+
+# a node of the ontology in tbl_onto_data, labels are Hindi
+OntoNode = namedtuple('OntoNode', ['onto_id', 'label', 'description'])
+
+
+# instrumentation, off until enable_stats(); every probe sits behind the one _stats_enabled check
+_stats_enabled = False
+_stats_hooks = []
+_stats_lock = threading.Lock()
+
+
+def _new_stats():
+    # stages maps a span name to [count, seconds], cache maps a cache name to [hits, misses]
+    return {'calls': {}, 'files_opened': 0, 'bytes_read': 0, 'records_parsed': 0, 'cache': {}, 'stages': {}}
 
-                if s in words:
-                    words[s].append(int(row[1]))
-                else:
-                    words[s] = []
-                    words[s].append(int(row[1]))
 
-    # serializing the words dictionary
-    filename = 'words_synid_mapping_dump'
-    outfile = open(filename, 'wb')
-    pickle.dump(words, outfile)
-    outfile.close()
-
-    reader = open('tbl_all_gujarati_synset_data.csv', encoding='utf8')
-    line = (reader.readline())
-    mapping = {}
-    while line:
-        offset = reader.tell()
-        line = reader.readline()
-        syn_id = line.split(',')[0]
-        if syn_id != '':
-            mapping[int(syn_id)]=offset
-        
+_stats = _new_stats()
+
+
+def enable_stats(hook=None):
+    '''Start collecting the counters reported by stats(), and pass spans to hook when given.'''
+    global _stats_enabled
+    if hook is not None:
+        add_stats_hook(hook)
+    _stats_enabled = True
+
+
+def disable_stats():
+    global _stats_enabled
+    _stats_enabled = False
 
 
-    # dump mapping
-    filename = 'synid_fileoffset_mapping_dump'
-    outfile = open(filename, 'wb')
-    pickle.dump(mapping, outfile)
-    outfile.close()
+def reset_stats():
+    global _stats
+    with _stats_lock:
+        _stats = _new_stats()
+
+
+def stats():
+    '''Return a snapshot of the counters collected since enable_stats() or reset_stats().
+
+    Eg: {
+      'enabled': True,
+      'calls': {'synsets': 12, 'Synset.hypernymy': 3, ...},
+      'files_opened': 4, 'bytes_read': 1843022, 'records_parsed': 61234,
+      'cache': {'synset': {'hits': 30, 'misses': 12}, ...},
+      'stages': {'load_words': {'count': 1, 'seconds': 0.21}, ...},
+    }
+    '''
+    with _stats_lock:
+        return {
+            'enabled': _stats_enabled,
+            'calls': dict(_stats['calls']),
+            'files_opened': _stats['files_opened'],
+            'bytes_read': _stats['bytes_read'],
+            'records_parsed': _stats['records_parsed'],
+            'cache': {name: {'hits': hits, 'misses': misses} for name, (hits, misses) in _stats['cache'].items()},
+            'stages': {name: {'count': count, 'seconds': seconds} for name, (count, seconds) in _stats['stages'].items()},
+        }
+
+
+def add_stats_hook(hook):
+    '''Call hook(name, start, seconds, attrs) whenever a span ends while stats are enabled.
+
+    start is a time.perf_counter() value and attrs the keyword arguments given to span().
+    '''
+    with _stats_lock:
+        if hook not in _stats_hooks:
+            _stats_hooks.append(hook)
+
+
+def remove_stats_hook(hook):
+    with _stats_lock:
+        if hook in _stats_hooks:
+            _stats_hooks.remove(hook)
+
+
+class _Span:
+    __slots__ = ('name', 'attrs', '_start')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self._start
+        with _stats_lock:
+            stage = _stats['stages'].setdefault(self.name, [0, 0.0])
+            stage[0] += 1
+            stage[1] += seconds
+            hooks = list(_stats_hooks)
+        for hook in hooks:
+            hook(self.name, self._start, seconds, self.attrs)
+        return False
+
+
+_NULL_SPAN = nullcontext()
+
+
+def span(name, **attrs):
+    '''Context manager timing a stage into stats() and the hooks, a shared no-op while stats are disabled.'''
+    if not _stats_enabled:
+        return _NULL_SPAN
+    return _Span(name, attrs)
+
+
+def _count_call(name):
+    with _stats_lock:
+        _stats['calls'][name] = _stats['calls'].get(name, 0) + 1
+
+
+def _count_io(files_opened=0, bytes_read=0, records_parsed=0):
+    with _stats_lock:
+        _stats['files_opened'] += files_opened
+        _stats['bytes_read'] += bytes_read
+        _stats['records_parsed'] += records_parsed
+
+
+def _count_file(infile, records_parsed):
+    # called once a file has been read through, its size is the bytes read
+    _count_io(1, os.fstat(infile.fileno()).st_size, records_parsed)
+
+
+def _count_cache(name, hit):
+    with _stats_lock:
+        counts = _stats['cache'].setdefault(name, [0, 0])
+        counts[0 if hit else 1] += 1
+
+# the Gujarati block mirrors the Devanagari one 0x180 code points higher
+_DEVANAGARI_TO_GUJARATI = {cp: cp + 0x180 for cp in range(0x0900, 0x0980) if unicodedata.name(chr(cp + 0x180), None)}
+
+
+def _to_gujarati(text):
+    # nukta letters have no precomposed Gujarati form, decompose them first
+    return unicodedata.normalize('NFD', text).translate(_DEVANAGARI_TO_GUJARATI)
+
+
+# WX transliteration of the Hindi morphology rules, vowels map to their sign after a consonant
+# and M followed by z is the chandrabindu
+_WX_VOWELS = {'a': ('अ', ''), 'A': ('आ', 'ा'), 'i': ('इ', 'ि'), 'I': ('ई', 'ी'), 'u': ('उ', 'ु'), 'U': ('ऊ', 'ू'),
+              'q': ('ऋ', 'ृ'), 'e': ('ए', 'े'), 'E': ('ऐ', 'ै'), 'o': ('ओ', 'ो'), 'O': ('औ', 'ौ')}
+_WX_CONSONANTS = dict(zip('kKgGfcCjJFtTdDNwWxXnpPbBmyrlvSRsh', 'कखगघङचछजझञटठडढणतथदधनपफबभमयरलवशषसह'))
+_WX_SIGNS = {'M': 'ं', 'z': 'ँ', 'H': 'ः'}
+
+
+def _wx_suffix_to_gujarati(text):
+    # text follows the stem, so a leading vowel is a sign, None when it is not plain WX
+    out = []
+    after_consonant, at_start = True, True
+    text = text.replace('Mz', 'z')
+    for char in text:
+        if char in _WX_VOWELS:
+            out.append(_WX_VOWELS[char][after_consonant])
+            after_consonant = False
+        elif char in _WX_CONSONANTS:
+            if after_consonant and not at_start:
+                out.append('्')
+            out.append(_WX_CONSONANTS[char])
+            after_consonant = True
+        elif char in _WX_SIGNS:
+            out.append(_WX_SIGNS[char])
+            after_consonant = False
+        elif char == ' ':
+            out.append('_')
+            after_consonant = False
+        else:
+            return None
+        at_start = False
+    return _to_gujarati(''.join(out))
+
+
+# root of the hypernym hierarchy used by the similarity measures, verbs share a virtual root 0
+HYPERNYM_ROOTS = {'NOUN': 73, 'VERB': 0}
+
+ANTONYMY_TYPES = ['action','personality','amount','place','colour','quality','direction','size','gender','state','manner','time']
+MERONYMY_TYPES = ['component_object','feature_activity','member_collection','phase_state','place_area','portion_mass','position_area','resource_process','stuff_object']
+
+# link type prefixes all_relations() groups under one relation, keyed by the rest of the type
+_LINK_GROUPS = {'anto': 'antonymy', 'grad': 'gradation', 'mero': 'meronymy', 'holo': 'holonymy'}
+
+# relations Synset.closure() can follow: (table relation, subtypes, pos the relation is valid for)
+CLOSURE_RELATIONS = {
+    'hypernymy': ('hypernymy', None, ('NOUN', 'VERB')),
+    'hyponymy': ('hyponymy', None, ('NOUN',)),
+    'entailment': ('entailment', None, ('VERB',)),
+    'troponymy': ('troponymy', None, ('VERB',)),
+    'antonymy': ('anto', ANTONYMY_TYPES, ('NOUN', 'VERB', 'ADJECTIVE', 'ADVERB')),
+    'meronymy': ('mero', MERONYMY_TYPES, ('NOUN',)),
+    'holonymy': ('holo', MERONYMY_TYPES, ('NOUN',)),
+}
 
 
 class IndoWordNetError(Exception):
     '''An exception class for wordnet-related errors.'''
 
 class Lemma:
+    __slots__ = ('_synset', '_name')
+    _lang = 'hindi'
+
     def __init__(self, synset, name):
         self._synset = synset
         self._name = name
-        self._lang = 'hindi'
 
     def __repr__(self):
         return 'Lemma(\'{}.{}.{}.{}\')'.format(self._synset.head_word(), self._synset.pos(), self._synset.synset_id(), self._name)
@@ -80,18 +1024,27 @@ class Lemma:
 
 
 class Synset:
+    __slots__ = ('_synset_id', '_head_word', '_lemma_names', '_pos', '_gloss', '_examples', '_wordnet', '_lemmas')
 
-    def __init__(self, synset_id, head_word, lemma_names, pos, gloss, examples):
+    def __init__(self, synset_id, head_word, lemma_names, pos, gloss, examples, wordnet=None):
         self._synset_id = synset_id
         self._head_word = head_word
         self._lemma_names = lemma_names
         self._pos = pos
         self._gloss = gloss
         self._examples = examples
+        self._wordnet = wordnet if wordnet is not None else _wordnet()
+        self._lemmas = None
 
     def __repr__(self):
         return 'Synset(\'{}.{}.{}\')'.format(self._head_word, self._pos, self._synset_id)
 
+    def __eq__(self, other):
+        return isinstance(other, Synset) and self._synset_id == other._synset_id
+
+    def __hash__(self):
+        return hash(self._synset_id)
+
     def synset_id(self):
         return self._synset_id
 
@@ -102,7 +1055,9 @@ class Synset:
         return self._lemma_names
 
     def lemmas(self):
-        return [Lemma(self, lemma)for lemma in self._lemma_names]
+        if self._lemmas is None:
+            self._lemmas = tuple(Lemma(self, lemma) for lemma in self._lemma_names)
+        return list(self._lemmas)
 
     def pos(self):
         return self._pos
@@ -113,59 +1068,52 @@ class Synset:
     def examples(self):
         return self._examples
 
-    def _relations(self, relation):
-        synset_id_list = []
-        with open('relations/tbl_{}_{}.csv'.format(self._pos.lower(), relation),encoding='utf8') as reader:
-            csv_reader = csv.reader(reader, delimiter=',')
-            next(csv_reader)
-            for line in csv_reader:
-                x = int(line[0].strip())
-                if self._synset_id == x:
-                    synset_id_list.append(int(line[1]))
-
-        # load synset offset mapping
-        synset_filename = 'synid_fileoffset_mapping_dump'
-        infile = open(synset_filename, 'rb')
-        synset_offset_mapping = pickle.load(infile)
-        infile.close()
-
-        # find all synsets
-        all_synsets = []
-        with open('tbl_all_gujarati_synset_data.csv', encoding='utf8') as reader:
-            for i in synset_id_list:
-                offset = synset_offset_mapping[i]
-                reader.seek(offset)
-                csv_reader = csv.reader(reader)
-                syn_data = next(csv_reader)
-                syn_id = int(syn_data[0])
-                syn_pos = syn_data[-1]
-                syn_lemmas = syn_data[2].split(',')
-                syn_headword = syn_lemmas[0]
-                syn_definition = syn_data[3].split(';')[0]
-                syn_examples = syn_data[3].split(';')[-1]
-                all_synsets.append(
-                    Synset(syn_id, syn_headword, syn_lemmas, syn_pos, syn_definition, syn_examples))
-        return all_synsets
+    def _relations(self, relation, subtypes=None):
+        wordnet = self._wordnet
+        return wordnet._synsets_from_ids(wordnet._relation_ids(self._pos, relation, self._synset_id, subtypes))
 
 
     def hypernymy(self, lvl=None):
 
+        if _stats_enabled:
+            _count_call('Synset.hypernymy')
         if self._pos in ['ADJECTIVE', 'ADVERB']:
 
             raise IndoWordNetError('This synset relation is not valid for adjectives and adverbs.')
         if lvl is not None:
-            all_synsets = [[self]]
-            for i in range(lvl):
-                lvl_synsets = []
-                for x in all_synsets[i]:
-                    for y in x.hypernymy():
-                        lvl_synsets.append(y)
-                all_synsets.append(lvl_synsets)
-            return all_synsets  
+            all_synsets = self.closure('hypernymy', lvl, levels=True)
+            # levels past the top of the hierarchy stay empty
+            return all_synsets + [[] for _ in range(lvl + 1 - len(all_synsets))]
         else:
             return self._relations('hypernymy')
 
+    def closure(self, relation, max_depth=None, levels=False, depths=False):
+        '''Return the synsets reachable from this one over relation, breadth first.
+
+        relation is a key of CLOSURE_RELATIONS. Each synset appears once, at the
+        depth it is first reached, and the walk stops after max_depth edges when
+        given. By default a flat list nearest first, without this synset. With
+        levels, [[self], [synsets at depth 1], ...]; with depths, a list of
+        (synset, depth) pairs.
+        '''
+        if _stats_enabled:
+            _count_call('Synset.closure')
+        if relation not in CLOSURE_RELATIONS:
+            raise IndoWordNetError('Unknown relation {!r}, expected one of {}.'.format(relation, list(CLOSURE_RELATIONS)))
+        name, subtypes, valid_pos = CLOSURE_RELATIONS[relation]
+        if self._pos not in valid_pos:
+            raise IndoWordNetError('The {} relation is not valid for {} synsets.'.format(relation, self._pos.lower()))
+        wordnet = self._wordnet
+        id_levels = wordnet._closure_levels(self._pos, name, self._synset_id, max_depth, subtypes)
+        if levels:
+            return [[self]] + [wordnet._synsets_from_ids(ids) for ids in id_levels[1:]]
+        if depths:
+            return [(ss, depth) for depth, ids in enumerate(id_levels[1:], 1) for ss in wordnet._synsets_from_ids(ids)]
+        return wordnet._synsets_from_ids(i for ids in id_levels[1:] for i in ids)
+
     def hyponymy(self):
+        if _stats_enabled:
+            _count_call('Synset.hyponymy')
         if self._pos in ['ADJECTIVE', 'ADVERB','VERB']:
             raise IndoWordNetError(
                 'This synset relation is not valid for adjectives,noun and adverbs.')
@@ -174,6 +1122,8 @@ class Synset:
 
     def entailment(self):
 
+        if _stats_enabled:
+            _count_call('Synset.entailment')
         if self._pos in ['ADJECTIVE', 'ADVERB','NOUN']:
             raise IndoWordNetError(
                 'This synset relation is not valid for adjectives,noun and adverbs.')
@@ -181,6 +1131,8 @@ class Synset:
 
     def troponymy(self):
 
+        if _stats_enabled:
+            _count_call('Synset.troponymy')
         if self._pos in ['ADJECTIVE', 'ADVERB','NOUN']:
             raise IndoWordNetError(
                 'This synset relation is not valid for adjectives,noun and adverbs.')
@@ -188,376 +1140,1825 @@ class Synset:
 
 
     def antonymy(self):
-        
-        cat =['action','personality','amount','place','colour','quality','direction','size','gender','state','manner','time']
-        synset_id_list = set()
-        for c in cat:
-            with open('relations/tbl_{}_anto_{}.csv'.format(self._pos.lower(), c),encoding='utf8') as reader:
-                
-                csv_reader = csv.reader(reader, delimiter=',')
-                next(csv_reader)
-                for line in csv_reader:
-                    x = int(line[0].strip())
-                    if self._synset_id == x:
-                        synset_id_list.add(int(line[2]))
-            
-        # load synset offset mapping
-        synset_filename = 'synid_fileoffset_mapping_dump'
-        infile = open(synset_filename, 'rb')
-        synset_offset_mapping = pickle.load(infile)
-        infile.close()
-
-        # find all synsets
-        all_synsets = []
-        with open('tbl_all_gujarati_synset_data.csv', encoding='utf8') as reader:
-            for i in synset_id_list:
-                offset = synset_offset_mapping[i]
-                reader.seek(offset)
-                csv_reader = csv.reader(reader)
-                syn_data = next(csv_reader)
-                syn_id = int(syn_data[0])
-                syn_pos = syn_data[-1]
-                syn_lemmas = syn_data[2].split(',')
-                syn_headword = syn_lemmas[0]
-                syn_definition = syn_data[3].split(';')[0]
-                syn_examples = syn_data[3].split(';')[-1]
-                all_synsets.append(
-                    Synset(syn_id, syn_headword, syn_lemmas, syn_pos, syn_definition, syn_examples))
-        return all_synsets
+        if _stats_enabled:
+            _count_call('Synset.antonymy')
+        return self._relations('anto', ANTONYMY_TYPES)
     
     def meronymy(self):
         
+        if _stats_enabled:
+            _count_call('Synset.meronymy')
         if self._pos in ['ADJECTIVE', 'ADVERB','VERB']:
             raise IndoWordNetError(
                 'This synset relation is not valid for adjectives,verbs and adverbs.')
-        
-        cat =['component_object','feature_activity','member_collection','phase_state','place_area','portion_mass','position_area','resource_process','stuff_object']
-        synset_id_list = set()
-        for c in cat:
-            with open('relations/tbl_{}_mero_{}.csv'.format(self._pos.lower(), c),encoding='utf-8') as reader:
-                
-                csv_reader = csv.reader(reader, delimiter=',')
-                next(csv_reader)
-                for line in csv_reader:
-                    x = int(line[0].strip())
-                    if self._synset_id == x:
-                        synset_id_list.add(int(line[1]))
-            
-        # load synset offset mapping
-        synset_filename = 'synid_fileoffset_mapping_dump'
-        infile = open(synset_filename, 'rb')
-        synset_offset_mapping = pickle.load(infile)
-        infile.close()
-
-        # find all synsets
-        all_synsets = []
-        with open('tbl_all_gujarati_synset_data.csv', encoding='utf8') as reader:
-            for i in synset_id_list:
-                offset = synset_offset_mapping[i]
-                reader.seek(offset)
-                csv_reader = csv.reader(reader)
-                syn_data = next(csv_reader)
-                syn_id = int(syn_data[0])
-                syn_pos = syn_data[-1]
-                syn_lemmas = syn_data[2].split(',')
-                syn_headword = syn_lemmas[0]
-                syn_definition = syn_data[3].split(';')[0]
-                syn_examples = syn_data[3].split(';')[-1]
-                all_synsets.append(
-                    Synset(syn_id, syn_headword, syn_lemmas, syn_pos, syn_definition, syn_examples))
-        return all_synsets
+        return self._relations('mero', MERONYMY_TYPES)
 
     def holonymy(self):
         
+        if _stats_enabled:
+            _count_call('Synset.holonymy')
         if self._pos in ['ADJECTIVE', 'ADVERB','VERB']:
             raise IndoWordNetError(
                 'This synset relation is not valid for adjectives,verbs and adverbs.')
-        
-        cat =['component_object','feature_activity','member_collection','phase_state','place_area','portion_mass','position_area','resource_process','stuff_object']
-        synset_id_list = set()
-        for c in cat:
-            with open('relations/tbl_{}_holo_{}.csv'.format(self._pos.lower(), c),encoding='utf-8') as reader:
-                
-                csv_reader = csv.reader(reader, delimiter=',')
-                next(csv_reader)
-                for line in csv_reader:
-                    x = int(line[0].strip())
-                    if self._synset_id == x:
-                        synset_id_list.add(int(line[1]))
-            
-        # load synset offset mapping
-        synset_filename = 'synid_fileoffset_mapping_dump'
-        infile = open(synset_filename, 'rb')
-        synset_offset_mapping = pickle.load(infile)
-        infile.close()
-
-        # find all synsets
+        return self._relations('holo', MERONYMY_TYPES)
+
+    def all_relations(self):
+        '''Return every relation of this synset, {relation: {subtype: [Synset, ...]}}.
+
+        Antonymy, gradation, meronymy and holonymy are keyed by subtype (Eg:
+        {'antonymy': {'gender': [...]}}), every other relation by None, near synsets
+        of tbl_near_synset included. Tables the link manifest does not list for this
+        synset are never read.
+        '''
+        if _stats_enabled:
+            _count_call('Synset.all_relations')
+        return self._wordnet._all_relations(self._pos, self._synset_id)
+
+    def onto_nodes(self):
+        '''Return the OntoNodes this synset is filed under in tbl_onto_nodes.'''
+        nodes_of, labels = self._wordnet._ontology()[:2]
+        return [labels[node] for node in nodes_of.get(self._synset_id, ()) if node in labels]
+
+
+
+def _ancestor_map(parents, synset_id, virtual_root=False):
+    # breadth first up a hypernymy table, {ancestor_id: minimum number of edges}
+    with span('hypernym_walk'):
+        ancestors = {synset_id: 0}
+        frontier = [synset_id]
+        depth = 0
+        while frontier:
+            depth += 1
+            next_frontier = []
+            for x in frontier:
+                hypernyms = parents.get(x)
+                if not hypernyms:
+                    if virtual_root and 0 not in ancestors:
+                        ancestors[0] = depth
+                    continue
+                for parent in hypernyms:
+                    if parent not in ancestors:
+                        ancestors[parent] = depth
+                        next_frontier.append(parent)
+            frontier = next_frontier
+    return ancestors
+
+
+# gloss tokens are split on whitespace, ASCII punctuation (which includes the '_' of
+# multiword lemmas), dandas and typographic quotes
+_TOKEN_SPLIT = re.compile(r'[\s!-/:-@\[-`{-~\u0964\u0965\u2018\u2019\u201c\u201d\u2026]+')
+
+# relations whose glosses extended Lesk adds to a sense
+_LESK_NEIGHBOUR_RELATIONS = {'NOUN': ('hypernymy', 'hyponymy'), 'VERB': ('hypernymy', 'troponymy')}
+
+# relations expand() follows by default and the weight of one edge of each,
+# keyed like all_relations(), a relation left out is not followed
+EXPANSION_WEIGHTS = {'similar': 0.9, 'near_synset': 0.9, 'hypernymy': 0.7, 'hyponymy': 0.6, 'also_see': 0.5,
+                     'troponymy': 0.5, 'entailment': 0.4}
+# cross-pos table of near synsets, the only relation table without a pos
+NEAR_SYNSET_TABLE = 'tbl_near_synset'
+
+# relations random_walks() steps along by default, keyed like all_relations()
+WALK_RELATIONS = ('hypernymy', 'hyponymy', 'meronymy', 'holonymy', 'antonymy', 'troponymy')
+
+
+def _tokenize(text):
+    return [token.lower() for token in _TOKEN_SPLIT.split(text) if token]
+
+
+def _deletions(word, max_edits):
+    # {variant: fewest deletions reaching it} for every variant within max_edits deletions
+    variants = {word: 0}
+    frontier = {word}
+    for deletions in range(1, max_edits + 1):
+        frontier = {x[:i] + x[i + 1:] for x in frontier for i in range(len(x))} - variants.keys()
+        variants.update(dict.fromkeys(frontier, deletions))
+    return variants
+
+
+def _edit_distance(word1, word2, max_edits):
+    # Levenshtein distance, anything above max_edits is reported as max_edits + 1
+    if abs(len(word1) - len(word2)) > max_edits:
+        return max_edits + 1
+    # a shared prefix and suffix cost nothing, only the middle is compared
+    start = 0
+    while start < len(word1) and start < len(word2) and word1[start] == word2[start]:
+        start += 1
+    end1, end2 = len(word1), len(word2)
+    while end1 > start and end2 > start and word1[end1 - 1] == word2[end2 - 1]:
+        end1 -= 1
+        end2 -= 1
+    word1, word2 = word1[start:end1], word2[start:end2]
+    # only cells within max_edits of the diagonal can stay within max_edits
+    over = max_edits + 1
+    previous = [j if j <= max_edits else over for j in range(len(word2) + 1)]
+    for i, char1 in enumerate(word1, 1):
+        current = [i if i <= max_edits else over] + [over] * len(word2)
+        for j in range(max(1, i - max_edits), min(len(word2), i + max_edits) + 1):
+            current[j] = min(current[j - 1] + 1, previous[j] + 1, previous[j - 1] + (char1 != word2[j - 1]), over)
+        if min(current) > max_edits:
+            return over
+        previous = current
+    return min(previous[-1], over)
+
+
+class _LRUCache:
+    # thread-safe mapping that evicts the least recently used entry beyond maxsize,
+    # maxsize None means unbounded and 0 disables caching
+    _MISSING = object()
+
+    def __init__(self, maxsize, name='cache'):
+        self.maxsize = maxsize
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, self._MISSING)
+            if _stats_enabled:
+                _count_cache(self.name, value is not self._MISSING)
+            if value is self._MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        # keeps an entry another thread stored meanwhile and returns the cached value
+        if self.maxsize == 0:
+            return value
+        with self._lock:
+            value = self._data.setdefault(key, value)
+            if self.maxsize is not None and len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return value
+
+    def values(self):
+        with self._lock:
+            return list(self._data.values())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class GujaratiWordNet:
+    '''Handle on a Gujarati WordNet data directory.
+
+    Each index (words mapping, synset store, relation tables) is loaded on
+    first use and kept for the lifetime of the handle. With backend='sqlite'
+    they are read from the database setup(database=True) writes instead, one
+    indexed query per lookup, which any number of threads and processes can
+    share.
+    '''
+
+    BACKENDS = ('files', 'sqlite')
+
+    def __init__(self, data_dir='.', cache_size=DEFAULT_CACHE_SIZE, similarity_cache_size=DEFAULT_CACHE_SIZE,
+                 backend='files'):
+        if backend not in self.BACKENDS:
+            raise IndoWordNetError('Unknown backend {!r}, expected one of {}.'.format(backend, ', '.join(self.BACKENDS)))
+        self._data_dir = Path(data_dir)
+        self._backend = backend
+        self._database = None
+        self._words_synset_mapping = None
+        self._sense_count_index = None
+        self._synset_store = None
+        # relation index, built lazily one table at a time
+        # key is (pos, relation, subtype), value maps a source synset_id to a tuple of target synset_ids
+        # Eg: {
+        #   ('noun', 'hypernymy', None): {11: (2377,), ...},
+        #   ('noun', 'anto', 'gender'): {2954: (858,), ...},
+        #    ...
+        # }
+        self._relation_index = {}
+        # hypernym ancestor index, per pos the ancestor map of every synset asked about so far
+        # Eg: {
+        #   'NOUN': {33884: {33884: 0, 1857: 1, 1899: 2, 2954: 2, ...}, ...},
+        #    ...
+        # }
+        self._ancestor_index = {}
+        # synset_id -> Synset
+        self._synset_cache = _LRUCache(cache_size, 'synset')
+        # (measure, synset_id, synset_id) -> score
+        self._similarity_cache = _LRUCache(similarity_cache_size, 'similarity')
+        # reversed-suffix trie of the morphology rules and (word, pos) -> lemmas
+        self._morph_trie = None
+        self._morphy_cache = _LRUCache(cache_size, 'morphy')
+        # (query, pos, relations, max_hops, k, decay) -> [(lemma, score), ...]
+        self._expansion_cache = _LRUCache(cache_size, 'expansion')
+        # every lemma in code point order for prefix search, and the deletion index for fuzzy search
+        self._sorted_lemmas = None
+        self._deletes = None
+        # (synset -> onto nodes, onto node -> OntoNode, onto node -> pre-order interval,
+        #  nodes in pre-order, synset -> pre-order numbers of its nodes)
+        self._onto_index = None
+        # {pos: {synset_id: information content}}
+        self._ic_table = None
+        # {extended: {gloss token: (idf weight, frozenset of synset_ids)}}
+        self._gloss_indexes = {}
+        # per pos, the links index and the link types of its relation tables
+        self._link_index = {}
+        self._table_types = {}
+        # relations -> (synset_ids, indptr, indices), the adjacency random_walks() steps along
+        self._walk_graphs = {}
+
+    def __reduce__(self):
+        # the loaded indexes (an mmap, sqlite connections, locks) do not pickle,
+        # a copy is a fresh handle on the same data that loads them again
+        return (GujaratiWordNet, (self._data_dir, self._synset_cache.maxsize, self._similarity_cache.maxsize,
+                                  self._backend))
+
+    def __repr__(self):
+        if self._backend != 'files':
+            return 'GujaratiWordNet(\'{}\', backend=\'{}\')'.format(self._data_dir, self._backend)
+        return 'GujaratiWordNet(\'{}\')'.format(self._data_dir)
+
+    def data_dir(self):
+        return self._data_dir
+
+    def backend(self):
+        return self._backend
+
+    def _db(self):
+        if self._database is None:
+            self._database = _Database(self._data_dir / DATABASE_FILENAME)
+        return self._database
+
+    def _rows(self, stem):
+        # rows of a table of the relations directory, without its header
+        if self._backend == 'sqlite':
+            return self._db().query('SELECT * FROM {} ORDER BY rowid'.format(_quote(stem)))
+        return _csv_rows(self._data_dir / 'relations' / (stem + '.csv'))
+
+    def _words(self):
+        if self._words_synset_mapping is None and self._backend == 'sqlite':
+            self._words_synset_mapping = _DatabaseLemmas(self._db())
+        elif self._words_synset_mapping is None:
+            with span('load_words'), open(self._data_dir / WORDS_FILENAME, 'rb') as infile:
+                self._words_synset_mapping = pickle.load(infile)
+                if _stats_enabled:
+                    _count_file(infile, len(self._words_synset_mapping))
+        return self._words_synset_mapping
+
+    def _store(self):
+        if self._synset_store is None and self._backend == 'sqlite':
+            self._synset_store = _DatabaseStore(self._db())
+        elif self._synset_store is None:
+            with span('load_synset_store'):
+                self._synset_store = SynsetStore(self._data_dir / SYNSET_STORE_FILENAME)
+        return self._synset_store
+
+    def _relation_table(self, pos, relation, subtype=None):
+        key = (pos.lower(), relation, subtype)
+        table = self._relation_index.get(key)
+        if table is None:
+            name = relation if subtype is None else '{}_{}'.format(relation, subtype)
+            table = self._table('tbl_{}_{}'.format(key[0], name))
+            self._relation_index[key] = table
+        return table
+
+    def _table(self, stem):
+        if self._backend == 'sqlite':
+            return _DatabaseTable(self._db(), stem)
+        # the table setup() compiled, unless the csv was edited after it
+        source = self._data_dir / 'relations' / (stem + '.csv')
+        compiled = self._data_dir / RELATION_INDEX_DIRNAME / (stem + '.pickle')
+        if compiled.exists() and compiled.stat().st_mtime_ns >= source.stat().st_mtime_ns:
+            with span('load_relations', table=stem), open(compiled, 'rb') as infile:
+                table = pickle.load(infile)
+                if _stats_enabled:
+                    _count_file(infile, len(table))
+            return table
+        return _read_relation_table(source)
+
+    def _relation_ids(self, pos, relation, synset_id, subtypes=None):
+        if subtypes is None:
+            if not self._may_link(pos, synset_id, relation):
+                return []
+            return list(self._relation_table(pos, relation).get(synset_id, ()))
+        # union over all subtype tables, keeping first-seen order
+        ids = {}
+        for subtype in subtypes:
+            if not self._may_link(pos, synset_id, '{}_{}'.format(relation, subtype)):
+                continue
+            for target in self._relation_table(pos, relation, subtype).get(synset_id, ()):
+                ids[target] = None
+        return list(ids)
+
+    def _links(self, pos):
+        # (synset_id -> link types, every link type listed) of a pos, None when nothing lists them
+        pos = pos.lower()
+        if pos not in self._link_index and self._backend == 'sqlite':
+            # a miss costs one indexed query there, as much as asking the links index would
+            self._link_index[pos] = None
+        elif pos not in self._link_index:
+            links = None
+            sources = _link_sources(self._data_dir, pos)
+            compiled = self._data_dir / RELATION_INDEX_DIRNAME / 'links_{}.pickle'.format(pos)
+            if compiled.exists() and all(compiled.stat().st_mtime_ns >= source.stat().st_mtime_ns for source in sources):
+                with span('load_links', pos=pos), open(compiled, 'rb') as infile:
+                    links = pickle.load(infile)
+                    if _stats_enabled:
+                        _count_file(infile, len(links))
+            elif sources and sources[0].stem.endswith('_relations'):
+                links = _read_links(sources)
+            # without setup() a pos without a manifest would have to read all its tables to know
+            self._link_index[pos] = None if links is None else (links, frozenset().union(*links.values()))
+        return self._link_index[pos]
+
+    def _may_link(self, pos, synset_id, link_type):
+        # False only when the links index lists link_type and not for this synset
+        links = self._links(pos)
+        if links is None or link_type not in links[1]:
+            return True
+        return link_type in links[0].get(synset_id, ())
+
+    def _link_types(self, pos):
+        # link types of every relation table of a pos
+        pos = pos.lower()
+        prefix = 'tbl_{}_'.format(pos)
+        if pos not in self._table_types and self._backend == 'sqlite':
+            self._table_types[pos] = tuple(
+                name[len(prefix):] for name, in self._db().query('SELECT name FROM relation_table ORDER BY name')
+                if name.startswith(prefix))
+        elif pos not in self._table_types:
+            self._table_types[pos] = tuple(
+                source.stem[len(prefix):] for source in sorted((self._data_dir / 'relations').glob(prefix + '*.csv'))
+                if _relation_target_column(source) is not None)
+        return self._table_types[pos]
+
+    def _relation_groups(self, pos):
+        # (relation, subtype, link type, table name) of every relation table of a pos,
+        # its table is _relation_table(pos, table name, subtype)
+        # Eg: [('also_see', None, 'also_see', 'also_see'), ('antonymy', 'action', 'anto_action', 'anto'), ...]
+        groups = []
+        for link_type in self._link_types(pos):
+            prefix, _, rest = link_type.partition('_')
+            if prefix in _LINK_GROUPS and rest:
+                groups.append((_LINK_GROUPS[prefix], rest, link_type, prefix))
+            else:
+                groups.append((link_type, None, link_type, link_type))
+        return groups
+
+    def _near_synsets(self):
+        table = self._relation_index.get(NEAR_SYNSET_TABLE)
+        if table is None:
+            if self._backend == 'files' and not (self._data_dir / 'relations' / (NEAR_SYNSET_TABLE + '.csv')).exists():
+                table = {}
+            else:
+                table = self._table(NEAR_SYNSET_TABLE)
+            self._relation_index[NEAR_SYNSET_TABLE] = table
+        return table
+
+    def _all_relations(self, pos, synset_id):
+        grouped = {}
+        for relation, subtype, link_type, name in self._relation_groups(pos):
+            if not self._may_link(pos, synset_id, link_type):
+                continue
+            found = self._synsets_from_ids(self._relation_table(pos, name, subtype).get(synset_id, ()))
+            if found:
+                grouped.setdefault(relation, {})[subtype] = found
+        found = self._synsets_from_ids(self._near_synsets().get(synset_id, ()))
+        if found:
+            grouped['near_synset'] = {None: found}
+        return grouped
+
+    def _closure_levels(self, pos, relation, synset_id, max_depth=None, subtypes=None):
+        # [[synset_id], [ids one edge away], ...], each id only in the level it is first reached
+        # a level is expanded in one pass over each table, trailing empty levels are dropped
+        tables = [self._relation_table(pos, relation, subtype) for subtype in (subtypes or (None,))]
+        visited = {synset_id}
+        levels = [[synset_id]]
+        while max_depth is None or len(levels) <= max_depth:
+            frontier = []
+            for table in tables:
+                for x in levels[-1]:
+                    for target in table.get(x, ()):
+                        if target not in visited:
+                            visited.add(target)
+                            frontier.append(target)
+            if not frontier:
+                break
+            levels.append(frontier)
+        return levels
+
+    def _ancestors(self, pos, synset_id):
+        # {ancestor_id: minimum number of hypernymy edges}, the synset itself at depth 0
+        # verb maps also carry the virtual root 0, one edge above every verb without a hypernym
+        index = self._ancestor_index.setdefault(pos, {})
+        ancestors = index.get(synset_id)
+        if ancestors is None:
+            ancestors = _ancestor_map(self._relation_table(pos, 'hypernymy'), synset_id, HYPERNYM_ROOTS[pos] == 0)
+            index[synset_id] = ancestors
+        return ancestors
+
+    def _make_synset(self, synset_id):
+        ss = self._synset_cache.get(synset_id)
+        if ss is not None:
+            return ss
+
+        record = self._store().record(synset_id)
+        if record is None:
+            return None
+        syn_lemmas, syn_definition, syn_examples, syn_pos = record
+        syn_lemmas = syn_lemmas.split(',')
+        syn_examples = syn_examples.strip('\\').split('/')
+        ss = Synset(synset_id, syn_lemmas[0], syn_lemmas, syn_pos, syn_definition, syn_examples, self)
+        return self._synset_cache.put(synset_id, ss)
+
+    def _synsets_from_ids(self, synset_ids):
+        # ids linked from the relation tables but missing from the synset data are skipped
         all_synsets = []
-        with open('tbl_all_gujarati_synset_data.csv', encoding='utf8') as reader:
-            for i in synset_id_list:
-                offset = synset_offset_mapping[i]
-                reader.seek(offset)
-                csv_reader = csv.reader(reader)
-                syn_data = next(csv_reader)
-                syn_id = int(syn_data[0])
-                syn_pos = syn_data[-1]
-                syn_lemmas = syn_data[2].split(',')
-                syn_headword = syn_lemmas[0]
-                syn_definition = syn_data[3].split(';')[0]
-                syn_examples = syn_data[3].split(';')[-1]
-                all_synsets.append(
-                    Synset(syn_id, syn_headword, syn_lemmas, syn_pos, syn_definition, syn_examples))
+        for i in synset_ids:
+            ss = self._make_synset(i)
+            if ss is not None:
+                all_synsets.append(ss)
         return all_synsets
 
+    def _synset_ids(self, lemma, pos=None):
+        postings = self._words().get(lemma, ())
+        if pos is None:
+            return [synset_id for synset_id, _ in postings]
+        pos = pos.upper()
+        return [synset_id for synset_id, synset_pos in postings if synset_pos == pos]
+
+    def _lookup_ids(self, word, pos=None):
+        # synset_ids of a word, None when it is neither a lemma nor an inflection of one
+        if word in self._words():
+            return self._synset_ids(word, pos)
+        # inflected forms resolve through their base forms
+        base_forms = self.morphy(word, pos)
+        if not base_forms:
+            return None
+        return list(dict.fromkeys(i for base in base_forms for i in self._synset_ids(base, pos)))
+
+    def synsets(self, lemma, pos=None):
+        if _stats_enabled:
+            _count_call('synsets')
+        synset_ids = self._lookup_ids(lemma, pos)
+        if synset_ids is None:
+            raise KeyError(lemma)
+        return self._synsets_from_ids(synset_ids)
+
+    def _morph_rules(self):
+        # trie over the reversed inflected endings, a node's None key holds the (replacement, pos)
+        # of every rule whose ending ends there
+        # Eg: {
+        #   'ો': {'ં': {None: [('ા', 'NOUN'), ('', 'NOUN')], ...}, ...},
+        #    ...
+        # }
+        if self._morph_trie is None:
+            trie = {}
+            with span('load_morph_rules'):
+                for ending, suffix, pos in self._rows('tbl_morph_rules'):
+                    ending, suffix = _wx_suffix_to_gujarati(ending), _wx_suffix_to_gujarati(suffix)
+                    if not ending or suffix is None:
+                        continue
+                    node = trie
+                    for char in reversed(ending):
+                        node = node.setdefault(char, {})
+                    rules = node.setdefault(None, [])
+                    if (suffix, pos.upper()) not in rules:
+                        rules.append((suffix, sys.intern(pos.upper())))
+            self._morph_trie = trie
+        return self._morph_trie
+
+    def morphy(self, word, pos=None):
+        '''Return the known base forms of a word, the word itself first when it is a lemma.
+
+        Candidates come from the inflection rules of tbl_morph_rules, matched in one
+        pass over the word's ending, and are kept only if the lemma index has them.
+        '''
+        if _stats_enabled:
+            _count_call('morphy')
+        pos = pos if pos is None else pos.upper()
+        key = (word, pos)
+        base_forms = self._morphy_cache.get(key)
+        if base_forms is None:
+            candidates = {word: None}
+            node = self._morph_rules()
+            i = len(word)
+            # the stem in front of an ending is never empty
+            while i > 1:
+                node = node.get(word[i - 1])
+                if node is None:
+                    break
+                i -= 1
+                for suffix, rule_pos in node.get(None, ()):
+                    if pos is None or rule_pos == pos:
+                        candidates[word[:i] + suffix] = None
+            base_forms = self._morphy_cache.put(key, tuple(c for c in candidates if self._synset_ids(c, pos)))
+        return list(base_forms)
+
+    def _lemma_keys(self):
+        # every lemma in code point order, read from the compiled deletion index when it is fresh
+        if self._sorted_lemmas is None:
+            if _is_fresh(self._data_dir / DELETION_INDEX_FILENAME, self._data_dir / 'gujarati_words.csv'):
+                self._sorted_lemmas = self._deletion_index(0).lemmas
+            else:
+                self._sorted_lemmas = tuple(sorted(self._words()))
+        return self._sorted_lemmas
+
+    def prefix_search(self, prefix, limit=10):
+        '''Return up to limit lemmas starting with prefix, in code point order.'''
+        if _stats_enabled:
+            _count_call('prefix_search')
+        keys = self._lemma_keys()
+        found = []
+        i = bisect.bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix) and (limit is None or len(found) < limit):
+            found.append(keys[i])
+            i += 1
+        return found
+
+    def _deletion_index(self, max_edits):
+        # the index setup() compiled, unless the words were edited after it or more edits are asked for
+        if self._deletes is None or self._deletes.max_edits < max_edits:
+            compiled = self._data_dir / DELETION_INDEX_FILENAME
+            if max_edits <= FUZZY_INDEX_EDITS and _is_fresh(compiled, self._data_dir / 'gujarati_words.csv'):
+                with span('load_deletion_index'):
+                    self._deletes = _DeletionIndex.load(compiled)
+            else:
+                with span('build_deletion_index', max_edits=max_edits):
+                    self._deletes = _DeletionIndex.build(self._lemma_keys(), max_edits)
+        return self._deletes
+
+    def fuzzy_search(self, word, max_edits=1, limit=10):
+        '''Return up to limit (edit distance, lemma) pairs within max_edits of word, closest first.
+
+        Lemmas and the query meet on a shared deletion variant, SymSpell style, and
+        every candidate is confirmed with the exact Levenshtein distance.
+        '''
+        if _stats_enabled:
+            _count_call('fuzzy_search')
+        index = self._deletion_index(max_edits)
+        found = []
+        for i in index.candidates(word, max_edits):
+            lemma = index.lemma(i)
+            distance = _edit_distance(word, lemma, max_edits)
+            if distance <= max_edits:
+                found.append((distance, lemma))
+        found.sort()
+        return found if limit is None else found[:limit]
+
+    def iter_morphy(self, tokens, pos=None):
+        '''Yield (token, [base form, ...]) for every token of an iterable, in order.'''
+        if _stats_enabled:
+            _count_call('iter_morphy')
+        for token in tokens:
+            yield token, self.morphy(token.strip(), pos)
+
+    def _sense_counts(self):
+        if self._sense_count_index is None:
+            self._sense_count_index = _read_sense_counts(self._rows('tbl_sense_count'))
+        return self._sense_count_index
+
+    def _information_content(self):
+        if self._ic_table is None:
+            filename = self._data_dir / IC_FILENAME
+            if self._backend == 'sqlite':
+                self._ic_table = {}
+                with span('load_information_content'):
+                    for pos, synset_id, value in self._db().query('SELECT pos, synset_id, ic FROM information_content'):
+                        self._ic_table.setdefault(pos, {})[synset_id] = value
+            elif _is_fresh(filename, *(self._data_dir / source for source in _IC_SOURCES)):
+                with span('load_information_content'), open(filename, 'rb') as infile:
+                    self._ic_table = pickle.load(infile)
+                    if _stats_enabled:
+                        _count_file(infile, sum(len(table) for table in self._ic_table.values()))
+            else:
+                # not built by setup() or stale, count it from the loaded indexes instead
+                self._ic_table = _information_content(
+                    self._words(), self._sense_counts(),
+                    {pos: self._relation_table(pos, 'hypernymy') for pos in HYPERNYM_ROOTS})
+        return self._ic_table
+
+    def sense_counts(self, word):
+        '''Return {pos: number of senses} of a word, from the Hindi counts of tbl_sense_count.'''
+        if _stats_enabled:
+            _count_call('sense_counts')
+        return dict(self._sense_counts().get(word, {}))
+
+    def _ontology(self):
+        # every node is numbered in pre-order, a node's subtree is then the interval
+        # [its number, the last number in its subtree], so membership is two comparisons
+        if self._onto_index is None:
+            nodes_of = self._table('tbl_onto_nodes')
+            labels = {}
+            for onto_id, label, description in self._rows('tbl_onto_data'):
+                labels[int(onto_id)] = OntoNode(int(onto_id), label, description)
+            children = {}
+            has_parent = set()
+            for parent, child in self._rows('tbl_onto_map'):
+                children.setdefault(int(parent), []).append(int(child))
+                has_parent.add(int(child))
+
+            nodes = set(labels) | set(children) | has_parent
+            for synset_nodes in nodes_of.values():
+                nodes.update(synset_nodes)
+            intervals = {}
+            order = []
+            # nodes missing from the map stand alone as their own roots
+            for root in sorted(nodes - has_parent):
+                stack = [(root, False)]
+                while stack:
+                    node, done = stack.pop()
+                    if done:
+                        intervals[node] = (intervals[node], len(order) - 1)
+                        continue
+                    if node in intervals:
+                        continue
+                    intervals[node] = len(order)
+                    order.append(node)
+                    stack.append((node, True))
+                    stack.extend((child, False) for child in reversed(children.get(node, ())))
+            numbers_of = {synset_id: tuple(intervals[node][0] for node in synset_nodes)
+                          for synset_id, synset_nodes in nodes_of.items()}
+            self._onto_index = (nodes_of, labels, intervals, order, numbers_of)
+        return self._onto_index
+
+    def synsets_under(self, onto_id):
+        '''Return the synsets filed under an ontology node or any node below it, by synset_id.'''
+        if _stats_enabled:
+            _count_call('synsets_under')
+        nodes_of, _, intervals, order, _ = self._ontology()
+        first, last = intervals[onto_id]
+        wanted = set(order[first:last + 1])
+        return self._synsets_from_ids(sorted(
+            synset_id for synset_id, synset_nodes in nodes_of.items() if not wanted.isdisjoint(synset_nodes)))
+
+    def is_under(self, synset, onto_id):
+        '''Tell whether synset is filed under an ontology node or any node below it.'''
+        first, last = self._ontology()[2][onto_id]
+        for number in self._onto_index[4].get(synset.synset_id(), ()):
+            if first <= number <= last:
+                return True
+        return False
+
+    def _gloss_index(self, extended=False):
+        # the index setup() compiled, unless one of its sources was edited after it
+        index = self._gloss_indexes.get(extended)
+        if index is None:
+            filename = self._data_dir / GLOSS_INDEX_FILENAMES[extended]
+            if _is_fresh(filename, *(self._data_dir / source for source in _gloss_index_sources(extended))):
+                with span('load_gloss_index', extended=extended), open(filename, 'rb') as infile:
+                    index = pickle.load(infile)
+                    if _stats_enabled:
+                        _count_file(infile, len(index))
+            else:
+                store = self._store()
+                neighbours = None
+                if extended:
+                    neighbours = {pos: [self._relation_table(pos, relation) for relation in relations]
+                                  for pos, relations in _LESK_NEIGHBOUR_RELATIONS.items()}
+                index = _gloss_index(((synset_id,) + store.record(synset_id) for synset_id in store), neighbours)
+            self._gloss_indexes[extended] = index
+        return index
+
+    def _senses(self, word, pos=None):
+        try:
+            return self.synsets(word, pos)
+        except KeyError:
+            return []
+
+    def disambiguate(self, sentence_tokens, target, pos=None, extended=False):
+        '''Return the sense of target that best fits the rest of a sentence, or None for an unknown word.
+
+        Simplified Lesk: each sense scores the idf weights of the context tokens its gloss
+        and examples share, extended also counts its hypernyms' and hyponyms' glosses.
+        Ties and sentences without overlap go to the first sense.
+        '''
+        if _stats_enabled:
+            _count_call('disambiguate')
+        tokens = list(sentence_tokens)
+        return self._lesk(tokens, [target], pos, extended, target in tokens)[0]
+
+    def disambiguate_all(self, sentence, pos=None, extended=False):
+        '''Return (token, Synset or None) for every token of a sentence, each disambiguated against the others.
+
+        sentence is a string or a list of tokens. All tokens are scored in one pass
+        over the posting lists of the sentence.
+        '''
+        if _stats_enabled:
+            _count_call('disambiguate_all')
+        tokens = _tokenize(sentence) if isinstance(sentence, str) else list(sentence)
+        return list(zip(tokens, self._lesk(tokens, tokens, pos, extended, True)))
+
+    def _lesk(self, tokens, targets, pos, extended, targets_in_context):
+        index = self._gloss_index(extended)
+        senses = {}
+        for target in targets:
+            if target.strip() not in senses:
+                senses[target.strip()] = self._senses(target.strip(), pos)
+        candidates = {ss.synset_id() for found in senses.values() for ss in found}
+
+        # the only pass over the posting lists: every candidate sense with the context tokens it shares
+        context = {}
+        for token in tokens:
+            for part in _tokenize(token):
+                context[part] = context.get(part, 0) + 1
+        shared = {}
+        for part in context:
+            posting = index.get(part)
+            if posting is not None:
+                for synset_id in posting[1] & candidates:
+                    shared.setdefault(synset_id, []).append(part)
+
+        chosen = []
+        for target in targets:
+            # a target is not its own context
+            own = {}
+            if targets_in_context:
+                for part in _tokenize(target):
+                    own[part] = own.get(part, 0) + 1
+            best, best_score = None, -1.0
+            for ss in senses[target.strip()]:
+                score = sum(index[part][0] for part in shared.get(ss.synset_id(), ())
+                            if context[part] > own.get(part, 0))
+                if score > best_score:
+                    best, best_score = ss, score
+            chosen.append(best)
+        return chosen
+
+    def expand(self, word_or_synset, relations=None, max_hops=2, k=10, decay=1.0, pos=None):
+        '''Return the k best lemmas related to a word or Synset, [(lemma, score), ...] best first.
+
+        Every sense of the word starts at score 1. Crossing an edge of a relation
+        in relations ({relation: weight}, names as in all_relations(), default
+        EXPANSION_WEIGHTS) multiplies the score by its weight and by decay, for up
+        to max_hops edges. A lemma scores as its best synset; the word itself is
+        left out. Results are cached per query.
+        '''
+        if _stats_enabled:
+            _count_call('expand')
+        relations = EXPANSION_WEIGHTS if relations is None else relations
+        if not all(0 < weight <= 1 for weight in relations.values()) or not 0 < decay <= 1:
+            raise IndoWordNetError('Expansion weights and decay must be in (0, 1].')
+        if isinstance(word_or_synset, Synset):
+            query = (word_or_synset.synset_id(),)
+        else:
+            query = word_or_synset
+        key = (query, pos, tuple(sorted(relations.items())), max_hops, k, decay)
+        expansion = self._expansion_cache.get(key)
+        if expansion is None:
+            if isinstance(word_or_synset, Synset):
+                start, own = [word_or_synset], None
+            else:
+                start, own = self._senses(word_or_synset, pos), word_or_synset
+            expansion = self._expansion_cache.put(key, tuple(self._expand(start, own, relations, max_hops, k, decay)))
+        return list(expansion)
+
+    def _expand(self, start, own, relations, max_hops, k, decay):
+        # best-first over synsets, scores only shrink along a path so the first time a
+        # synset is popped is its best score, and once k lemmas are out nothing later beats them
+        # a best path can take more hops than a worse one though, so a synset is expanded
+        # again whenever it comes back with fewer hops than it was expanded at
+        heap = [(-1.0, i, 0, ss.synset_id()) for i, ss in enumerate(start)]
+        heapq.heapify(heap)
+        tie = len(heap)
+        expanded = {}
+        found = {}
+        while heap and len(found) < k:
+            score, _, hops, synset_id = heapq.heappop(heap)
+            if expanded.get(synset_id, max_hops + 1) <= hops:
+                continue
+            first = synset_id not in expanded
+            expanded[synset_id] = hops
+            ss = self._make_synset(synset_id)
+            if ss is None:
+                continue
+            if first:
+                for lemma in ss.lemma_names():
+                    if lemma != own and lemma not in found and len(found) < k:
+                        found[lemma] = -score
+            if hops == max_hops:
+                continue
+            pos = ss.pos()
+            edges = [(relations[relation], self._relation_table(pos, name, subtype))
+                     for relation, subtype, link_type, name in self._relation_groups(pos)
+                     if relation in relations and self._may_link(pos, synset_id, link_type)]
+            if 'near_synset' in relations:
+                edges.append((relations['near_synset'], self._near_synsets()))
+            for weight, targets in edges:
+                for target in targets.get(synset_id, ()):
+                    if expanded.get(target, max_hops + 1) > hops + 1:
+                        tie += 1
+                        heapq.heappush(heap, (score * weight * decay, tie, hops + 1, target))
+        return found.items()
+
+    def synset(self, word):
+        if _stats_enabled:
+            _count_call('synset')
+        synset_id = int(word.split('.')[2])
+        return self._make_synset(synset_id)
+
+    def iter_synsets(self, tokens, pos=None, window=DEFAULT_WINDOW):
+        '''Yield (token, [Synset, ...]) for every token of an iterable, in order.
+
+        Tokens are looked up window at a time: repeated tokens in a window are
+        resolved once and their synset records are read in store order. Inflected
+        tokens resolve through morphy() as in synsets(), unknown tokens yield an
+        empty list.
+        '''
+        if _stats_enabled:
+            _count_call('iter_synsets')
+        batch = []
+        for token in tokens:
+            batch.append(token)
+            if len(batch) >= window:
+                yield from self._synsets_batch(batch, pos)
+                batch = []
+        if batch:
+            yield from self._synsets_batch(batch, pos)
+
+    def _synsets_batch(self, tokens, pos):
+        found = {token.strip(): None for token in tokens}
+        wanted = set()
+        for word in found:
+            found[word] = self._lookup_ids(word, pos) or []
+            wanted.update(found[word])
+        # the store is laid out by synset_id, so ascending ids read the mapped file front to back
+        synsets_by_id = {i: self._make_synset(i) for i in sorted(wanted)}
+        for word, synset_ids in found.items():
+            found[word] = [synsets_by_id[i] for i in synset_ids if synsets_by_id[i] is not None]
+        for token in tokens:
+            yield token, list(found[token.strip()])
+
+    def _pair_similarity(self, measure, sense1, sense2):
+        key = (measure, sense1.synset_id(), sense2.synset_id())
+        value = self._similarity_cache.get(key, _LRUCache._MISSING)
+        if value is _LRUCache._MISSING:
+            value = self._similarity_cache.put(key, _similarity(measure, sense1, sense2))
+        return value
+
+    def word_similarity(self, word1, word2, measure='wup', pos=None):
+        '''Return (score, sense1, sense2) for the best-scoring sense pair of two words.
+
+        Only senses of the same pos that the measure covers are paired, restricted
+        to pos when given. Returns None when no pair can be scored.
+        '''
+        if _stats_enabled:
+            _count_call('word_similarity')
+        if measure not in SIMILARITY_MEASURES:
+            raise IndoWordNetError('Unknown similarity measure {!r}, expected one of {}.'.format(measure, sorted(SIMILARITY_MEASURES)))
+        covered = _MEASURE_SCORES[measure][1] if measure in _MEASURE_SCORES else tuple(HYPERNYM_ROOTS)
+        if pos is not None:
+            covered = [pos.upper()] if pos.upper() in covered else []
+        senses1 = [ss for p in covered for ss in self._synsets_from_ids(self._lookup_ids(word1, p) or [])]
+        senses2 = [ss for p in covered for ss in self._synsets_from_ids(self._lookup_ids(word2, p) or [])]
+        best = None
+        for sense1 in senses1:
+            for sense2 in senses2:
+                if sense1.pos() != sense2.pos():
+                    continue
+                value = self._pair_similarity(measure, sense1, sense2)
+                if value is not None and (best is None or value > best[0]):
+                    best = (value, sense1, sense2)
+        return best
+
+    def all_pairs_similarity(self, out_dir, measure='wup', pos='NOUN', k=10, tile_size=256, workers=None):
+        '''Write the k most similar synsets of every synset in the pos hypernym hierarchy.
+
+        Rows are split into tiles of tile_size synsets scored against all others on a
+        process pool. Each tile is written to its own part-*.tsv file in out_dir, one
+        'synset_id<TAB>id:score id:score ...' line per synset; tiles already on disk are
+        skipped, so an interrupted run resumes where it stopped.
+        '''
+        if _stats_enabled:
+            _count_call('all_pairs_similarity')
+        if measure not in _MEASURE_SCORES or pos not in _MEASURE_SCORES[measure][1]:
+            raise IndoWordNetError('Measure {!r} is not defined for {}.'.format(measure, pos))
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        params = {'measure': measure, 'pos': pos, 'k': k, 'tile_size': tile_size}
+        params_file = out_dir / 'params.json'
+        if params_file.exists():
+            with open(params_file, encoding='utf8') as infile:
+                if json.load(infile) != params:
+                    raise IndoWordNetError('{} holds a run with different parameters.'.format(out_dir))
+        else:
+            with open(params_file, 'w', encoding='utf8') as outfile:
+                json.dump(params, outfile)
+
+        # workers map the compiled ancestor index instead of receiving it pickled
+        index_file = out_dir / 'ancestor_index'
+        if not index_file.exists():
+            hypernyms = self._relation_table(pos, 'hypernymy')
+            synset_ids = set(hypernyms)
+            for targets in hypernyms.values():
+                synset_ids.update(targets)
+            _write_ancestor_index(str(index_file) + '.tmp', {i: self._ancestors(pos, i) for i in synset_ids})
+            os.replace(str(index_file) + '.tmp', index_file)
+        with open(index_file, 'rb') as infile:
+            count = _ANCESTORS_HEADER.unpack(infile.read(_ANCESTORS_HEADER.size))[1]
+
+        parts = [(start, min(start + tile_size, count), str(out_dir / 'part-{:08d}.tsv'.format(start)))
+                 for start in range(0, count, tile_size)]
+        pending = [part for part in parts if not os.path.exists(part[2])]
+        if pending:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_all_pairs_worker_init,
+                                     initargs=(str(index_file),)) as executor:
+                futures = [executor.submit(_all_pairs_tile, start, stop, measure, pos, k, filename)
+                           for start, stop, filename in pending]
+                for future in as_completed(futures):
+                    future.result()
+        return [filename for start, stop, filename in parts]
+
+    def _walk_graph(self, relations):
+        # compressed sparse rows over every synset of the relations, numbered by synset_id
+        # the neighbours of node i are indices[indptr[i]:indptr[i + 1]], sorted
+        key = tuple(sorted(relations))
+        if key not in self._walk_graphs:
+            adjacency = {}
+            known = set()
+            for pos in WORDNET_POS:
+                for relation, subtype, link_type, name in self._relation_groups(pos):
+                    known.add(relation)
+                    if relation not in key:
+                        continue
+                    for synset_id, targets in self._relation_table(pos, name, subtype).items():
+                        adjacency.setdefault(synset_id, set()).update(targets)
+            unknown = set(key) - known
+            if unknown:
+                raise IndoWordNetError('Unknown relation {!r}, expected one of {}.'.format(
+                    sorted(unknown)[0], sorted(known)))
+            synset_ids = set(adjacency)
+            for targets in adjacency.values():
+                synset_ids.update(targets)
+            synset_ids = array('I', sorted(synset_ids))
+            number = {synset_id: i for i, synset_id in enumerate(synset_ids)}
+            indptr = array('I', [0])
+            indices = array('I')
+            for synset_id in synset_ids:
+                indices.extend(sorted(number[target] for target in adjacency.get(synset_id, ())))
+                indptr.append(len(indices))
+            self._walk_graphs[key] = (synset_ids, indptr, indices)
+        return self._walk_graphs[key]
+
+    def random_walks(self, num_walks=10, walk_length=80, relations=WALK_RELATIONS, p=1.0, q=1.0, seed=None,
+                     batch_size=1024, workers=None):
+        '''Yield node2vec walks over the synset graph, one 'synset_id synset_id ...\\n' line per walk.
+
+        num_walks walks of up to walk_length synsets start from every synset with
+        an outgoing edge of relations (a name or names as in all_relations()). A step returns to the previous synset with weight 1/p,
+        moves to one of its neighbours with weight 1 and further out with weight
+        1/q. Walks are generated batch_size at a time on a process pool of workers
+        processes, 0 walks in this process; the lines for a given seed are the same
+        whatever the number of workers.
+        '''
+        if _stats_enabled:
+            _count_call('random_walks')
+        if p <= 0 or q <= 0:
+            raise IndoWordNetError('p and q must be positive.')
+        if isinstance(relations, str):
+            relations = (relations,)
+        synset_ids, indptr, indices = self._walk_graph(relations)
+        starts = [i for i in range(len(synset_ids)) if indptr[i + 1] > indptr[i]]
+        rng = random.Random(seed)
+        batches = []
+        for _ in range(num_walks):
+            rng.shuffle(starts)
+            batches.extend((starts[i:i + batch_size], rng.getrandbits(64)) for i in range(0, len(starts), batch_size))
+        graph = (synset_ids, indptr, indices)
+
+        if workers == 0:
+            _walks_worker_init(*graph)
+            for batch, batch_seed in batches:
+                yield from _walks_batch(batch, batch_seed, walk_length, p, q)
+            return
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_walks_worker_init, initargs=graph)
+        try:
+            # batches come back in the order they were queued, a few ahead of the reader
+            pending = deque()
+            window = 2 * (workers or os.cpu_count() or 1)
+            for batch, batch_seed in batches:
+                pending.append(executor.submit(_walks_batch, batch, batch_seed, walk_length, p, q))
+                if len(pending) >= window:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def cache_info(self):
+        '''Return hits, misses, maxsize, currsize and approximate nbytes of the synset cache.'''
+        cache = self._synset_cache
+        hits, misses = cache.hits, cache.misses
+        cached = cache.values()
+        nbytes = 0
+        for ss in cached:
+            nbytes += sys.getsizeof(ss) + sys.getsizeof(ss._lemma_names) + sys.getsizeof(ss._examples)
+            nbytes += sum(sys.getsizeof(x) for x in ss._lemma_names)
+            nbytes += sum(sys.getsizeof(x) for x in ss._examples) + sys.getsizeof(ss._gloss)
+            if ss._lemmas is not None:
+                nbytes += sys.getsizeof(ss._lemmas) + sum(sys.getsizeof(x) for x in ss._lemmas)
+        return CacheInfo(hits, misses, cache.maxsize, len(cached), nbytes)
+
+    def cache_clear(self):
+        self._synset_cache.clear()
+        self._similarity_cache.clear()
+        self._morphy_cache.clear()
+        self._expansion_cache.clear()
+
+    def close(self):
+        '''Drop every loaded index, they are reloaded on next use.'''
+        self._database = None
+        self._words_synset_mapping = None
+        self._sense_count_index = None
+        self._synset_store = None
+        self._relation_index = {}
+        self._ancestor_index = {}
+        self._morph_trie = None
+        self._sorted_lemmas = None
+        self._deletes = None
+        self._onto_index = None
+        self._ic_table = None
+        self._gloss_indexes = {}
+        self._link_index = {}
+        self._table_types = {}
+        self._walk_graphs = {}
+        self.cache_clear()
+
+
+_default_wordnet = None
+
+
+def _wordnet():
+    global _default_wordnet
+    if _default_wordnet is None:
+        _default_wordnet = GujaratiWordNet()
+    return _default_wordnet
+
+
+def configure(data_dir='.', **kwargs):
+    '''Point the module-level functions at a data directory and backend, and return the new handle.
+
+    Keyword arguments are those of GujaratiWordNet, e.g. configure('data', backend='sqlite').
+    '''
+    global _default_wordnet
+    wordnet = GujaratiWordNet(data_dir, **kwargs)
+    if _default_wordnet is not None:
+        _default_wordnet.close()
+    _default_wordnet = wordnet
+    return wordnet
 
 
 def synsets(lemma, pos=None):
-    # load words_synset mapping
-    words_filename = 'words_synid_mapping_dump'
-    infile = open(words_filename, 'rb')
-    words_synset_mapping = pickle.load(infile)
-    infile.close()
-
-    # load synset offset mapping
-    synset_filename = 'synid_fileoffset_mapping_dump'
-    infile = open(synset_filename, 'rb')
-    synset_offset_mapping = pickle.load(infile)
-    infile.close()
-    
+    return _wordnet().synsets(lemma, pos)
 
-    # find all synsets
-    all_synsets = []
-    with open('tbl_all_gujarati_synset_data.csv', encoding='utf8') as reader:
-        for i in words_synset_mapping[lemma]:
-            offset = synset_offset_mapping[i]
-            reader.seek(offset)
-            csv_reader = csv.reader(reader)
-            syn_data = next(csv_reader)
-            syn_id = int(syn_data[0])
-            syn_pos = syn_data[-1]
-            syn_lemmas = syn_data[2].split(',')
-            syn_headword = syn_lemmas[0]
-            syn_definition = syn_data[3].split(';')[0]
-            syn_examples = syn_data[3].split(';')[-1]
-            all_synsets.append(
-                Synset(syn_id, syn_headword, syn_lemmas, syn_pos, syn_definition, syn_examples))
-    return all_synsets
 
+def synset(word):
+    return _wordnet().synset(word)
 
 
-def synset(word):
-    synset_id = int(word.split('.')[2])
-    # load synset offset mapping
-    synset_filename = 'synid_fileoffset_mapping_dump'
-    infile = open(synset_filename, 'rb')
-    synset_offset_mapping = pickle.load(infile)
-    infile.close()
-        
-    # find synset
-    if synset_id in synset_offset_mapping:
-        with open('tbl_all_gujarati_synset_data.csv', encoding='utf8') as reader:
-            offset = synset_offset_mapping[synset_id]
-            reader.seek(offset)
-            csv_reader = csv.reader(reader)
-            syn_data = next(csv_reader)
-            syn_id = int(syn_data[0])
-            syn_pos = syn_data[-1]
-            syn_lemmas = syn_data[2].split(',')
-            syn_headword = syn_lemmas[0]
-            syn_definition = syn_data[3].split(';')[0]
-            syn_examples = syn_data[3].split(';')[1].strip('\\').split('/')
-            
-            return Synset(syn_id, syn_headword, syn_lemmas, syn_pos, syn_definition, syn_examples)
-def similarity_path(sense1, sense2):
-    ancestors1 = {sense1.synset_id(): 1}
-    ancestors2 = {sense2.synset_id(): 1}
+def morphy(word, pos=None):
+    return _wordnet().morphy(word, pos)
 
-    queue1 = [sense1]
-    queue2 = [sense2]
-    
-    if sense1.pos() == sense2.pos() and sense1.pos() == 'NOUN':
-        while queue1:
-            x = queue1.pop()
-            for parent in x.hypernymy():
-                queue1.append(parent)
-                if parent.synset_id() not in ancestors1:
-                    ancestors1[parent.synset_id()] = ancestors1[x.synset_id()] + 1
-                else:
-                    ancestors1[parent.synset_id()] = min(
-                        ancestors1[parent.synset_id()], ancestors1[x.synset_id()] + 1)
-
-        while queue2:
-            x = queue2.pop()
-            for parent in x.hypernymy():
-                queue2.append(parent)
-                if parent.synset_id() not in ancestors2:
-                    ancestors2[parent.synset_id()] = ancestors2[x.synset_id()] + 1
-                else:
-                    ancestors2[parent.synset_id()] = min(
-                        ancestors2[parent.synset_id()], ancestors2[x.synset_id()] + 1)
 
-        min_dist = sys.maxsize
-        for item in ancestors1.keys():
-            if item in ancestors2:
-                min_dist = min(ancestors1[item]+ancestors2[item], min_dist)
+def iter_morphy(tokens, pos=None):
+    return _wordnet().iter_morphy(tokens, pos)
 
-        return 1.0/(min_dist-1)
-    
-    elif sense1.pos() == sense2.pos() and sense1.pos() == 'VERB':
-        
-        dummy_root =Synset(0, None, None, None, None, None)
-        ancestors1[dummy_root.synset_id()] = sys.maxsize
-        ancestors2[dummy_root.synset_id()] = sys.maxsize
-        
-        while queue1:
-            x = queue1.pop()
-            if not x.hypernymy():
-                ancestors1[dummy_root.synset_id()] = min(ancestors1[x.synset_id()] + 1,ancestors1[dummy_root.synset_id()])
-            else:
-                for parent in x.hypernymy():
-                    queue1.append(parent)
-                    if parent.synset_id() not in ancestors1:
-                        ancestors1[parent.synset_id()] = ancestors1[x.synset_id()] + 1
-                    else:
-                        ancestors1[parent.synset_id()] = min(
-                            ancestors1[parent.synset_id()], ancestors1[x.synset_id()] + 1)
 
-        while queue2:
-            x = queue2.pop()
-            if not x.hypernymy():
-                ancestors2[dummy_root.synset_id()] = min(ancestors2[x.synset_id()] + 1,ancestors2[dummy_root.synset_id()])
-            else:
-                for parent in x.hypernymy():
-                    queue2.append(parent)
-                    if parent.synset_id() not in ancestors2:
-                        ancestors2[parent.synset_id()] = ancestors2[x.synset_id()] + 1
-                    else:
-                        ancestors2[parent.synset_id()] = min(
-                            ancestors2[parent.synset_id()], ancestors2[x.synset_id()] + 1)
+def prefix_search(prefix, limit=10):
+    return _wordnet().prefix_search(prefix, limit)
+
+
+def fuzzy_search(word, max_edits=1, limit=10):
+    return _wordnet().fuzzy_search(word, max_edits, limit)
+
+
+def sense_counts(word):
+    return _wordnet().sense_counts(word)
+
+
+def iter_synsets(tokens, pos=None, window=DEFAULT_WINDOW):
+    return _wordnet().iter_synsets(tokens, pos, window)
+
+
+def cache_info():
+    return _wordnet().cache_info()
+
+
+def all_pairs_similarity(out_dir, measure='wup', pos='NOUN', k=10, tile_size=256, workers=None):
+    return _wordnet().all_pairs_similarity(out_dir, measure, pos, k, tile_size, workers)
+
+
+def word_similarity(word1, word2, measure='wup', pos=None):
+    return _wordnet().word_similarity(word1, word2, measure, pos)
+
+
+def synsets_under(onto_id):
+    return _wordnet().synsets_under(onto_id)
+
+
+def is_under(synset, onto_id):
+    return _wordnet().is_under(synset, onto_id)
+
+
+def disambiguate(sentence_tokens, target, pos=None, extended=False):
+    return _wordnet().disambiguate(sentence_tokens, target, pos, extended)
+
+
+def disambiguate_all(sentence, pos=None, extended=False):
+    return _wordnet().disambiguate_all(sentence, pos, extended)
+
+
+def expand(word_or_synset, relations=None, max_hops=2, k=10, decay=1.0, pos=None):
+    return _wordnet().expand(word_or_synset, relations, max_hops, k, decay, pos)
+
+
+def random_walks(num_walks=10, walk_length=80, relations=WALK_RELATIONS, p=1.0, q=1.0, seed=None, batch_size=1024,
+                 workers=None):
+    return _wordnet().random_walks(num_walks, walk_length, relations, p, q, seed, batch_size, workers)
+
+
+def iter_neighbours(out_dir):
+    '''Yield (synset_id, [(neighbour_id, score), ...]) from the part files of all_pairs_similarity().'''
+    for filename in sorted(Path(out_dir).glob('part-*.tsv')):
+        with open(filename, encoding='utf8') as reader:
+            for line in reader:
+                synset_id, _, neighbours = line.rstrip('\n').partition('\t')
+                yield int(synset_id), [(int(i), float(v)) for i, _, v in
+                                       (item.partition(':') for item in neighbours.split())]
+
+
+def _lowest_common_subsumer(ancestors1, ancestors2):
+    # the common ancestor on the shortest path between both senses, ties go to the deeper one
+    lcs = None
+    best = lcs_depth = sys.maxsize
+    for item in ancestors1.keys() & ancestors2.keys():
+        depth = ancestors1[item]
+        dist = depth + ancestors2[item]
+        if dist < best or (dist == best and (depth < lcs_depth or (depth == lcs_depth and item < lcs))):
+            lcs, best, lcs_depth = item, dist, depth
+    return lcs
+
+
+# the measures on two ancestor maps of the same pos, shared by the per-pair and bulk APIs
+def _path_score(ancestors1, ancestors2, root):
+    lcs = _lowest_common_subsumer(ancestors1, ancestors2)
+    if lcs is None:
+        return 1.0/(sys.maxsize-1)
+    return 1.0/(ancestors1[lcs] + ancestors2[lcs] + 1)
+
 
-        min_dist = sys.maxsize
-        for item in ancestors1.keys():
-            if item in ancestors2:
-                min_dist = min(ancestors1[item]+ancestors2[item], min_dist)
+def _wup_score(ancestors1, ancestors2, root):
+    if root not in ancestors1 or root not in ancestors2:
+        return None
+    lcs = _lowest_common_subsumer(ancestors1, ancestors2)
+    return (2.0*(ancestors1[root]-ancestors1[lcs])/(ancestors1[root] + ancestors2[root] + 2))
+
+
+def _lch_score(ancestors1, ancestors2, root):
+    if root not in ancestors1 or root not in ancestors2:
+        return None
+    lcs = _lowest_common_subsumer(ancestors1, ancestors2)
+    min_dist = ancestors1[lcs] + ancestors2[lcs]
+    return -1.0 * math.log10((min_dist+1)/(2 * (max(ancestors1[root],ancestors2[root]) + 1)))
+
+
+# measure name -> (score function, pos it covers)
+_MEASURE_SCORES = {
+    'path': (_path_score, ('NOUN', 'VERB')),
+    'wup': (_wup_score, ('NOUN', 'VERB')),
+    'lch': (_lch_score, ('NOUN',)),
+}
+
+
+# the information content measures, on the IC of the most informative common subsumer and of both senses
+def _res_score(lcs_ic, ic1, ic2):
+    return lcs_ic
+
+
+def _lin_score(lcs_ic, ic1, ic2):
+    if ic1 + ic2 == 0:
+        # both senses are the root itself
+        return 1.0
+    return 2.0 * lcs_ic / (ic1 + ic2)
+
+
+# jcn of identical senses, the distance is zero
+_JCN_IDENTICAL = 1e300
+
+
+def _jcn_score(lcs_ic, ic1, ic2):
+    distance = ic1 + ic2 - 2.0 * lcs_ic
+    if distance <= 1e-12:
+        return _JCN_IDENTICAL
+    return 1.0 / distance
+
+
+_IC_SCORES = {'res': _res_score, 'lin': _lin_score, 'jcn': _jcn_score}
+
+
+def _ic_similarity(measure, sense1, sense2):
+    pos = sense1.pos()
+    if pos != sense2.pos() or pos not in HYPERNYM_ROOTS:
+        return None
+    ic = sense1._wordnet._information_content()[pos]
+    ancestors1 = sense1._wordnet._ancestors(pos, sense1.synset_id())
+    ancestors2 = sense2._wordnet._ancestors(pos, sense2.synset_id())
+    lcs_ic = max((ic[item] for item in ancestors1.keys() & ancestors2.keys() if item in ic), default=None)
+    ic1, ic2 = ic.get(sense1.synset_id()), ic.get(sense2.synset_id())
+    # no shared subsumer, or a sense no word frequency reaches
+    if lcs_ic is None or (measure != 'res' and (ic1 is None or ic2 is None)):
+        return None
+    return _IC_SCORES[measure](lcs_ic, ic1, ic2)
+
+
+def _similarity(measure, sense1, sense2):
+    if measure in _IC_SCORES:
+        return _ic_similarity(measure, sense1, sense2)
+    score, covered = _MEASURE_SCORES[measure]
+    pos = sense1.pos()
+    if pos != sense2.pos() or pos not in covered:
+        return None
+    return score(sense1._wordnet._ancestors(pos, sense1.synset_id()),
+                 sense2._wordnet._ancestors(pos, sense2.synset_id()), HYPERNYM_ROOTS[pos])
+
+
+def similarity_path(sense1, sense2):
+    if _stats_enabled:
+        _count_call('similarity_path')
+    return _similarity('path', sense1, sense2)
 
-        return 1.0/(min_dist-1)
 
 def similarity_wup(sense1, sense2):
-    ancestors1 = {sense1.synset_id(): 1}
-    ancestors2 = {sense2.synset_id(): 1}
+    if _stats_enabled:
+        _count_call('similarity_wup')
+    return _similarity('wup', sense1, sense2)
 
-    queue1 = [sense1]
-    queue2 = [sense2]
-    
-    if sense1.pos() == sense2.pos() and sense1.pos() == 'NOUN':
-        root = 73
-        while queue1:
-            x = queue1.pop()
-            for parent in x.hypernymy():
-                queue1.append(parent)
-                if parent.synset_id() not in ancestors1:
-                    ancestors1[parent.synset_id()] = ancestors1[x.synset_id()] + 1
-                else:
-                    ancestors1[parent.synset_id()] = min(
-                        ancestors1[parent.synset_id()], ancestors1[x.synset_id()] + 1)
-
-        while queue2:
-            x = queue2.pop()
-            for parent in x.hypernymy():
-                queue2.append(parent)
-                if parent.synset_id() not in ancestors2:
-                    ancestors2[parent.synset_id()] = ancestors2[x.synset_id()] + 1
-                else:
-                    ancestors2[parent.synset_id()] = min(
-                        ancestors2[parent.synset_id()], ancestors2[x.synset_id()] + 1)
-
-        min_dist = sys.maxsize
-        lcs = None
-        for item in ancestors1.keys():
-            if item in ancestors2:
-                if (ancestors1[item]+ancestors2[item]) < min_dist:
-                    lcs = item
-                    min_dist = (ancestors1[item]+ancestors2[item])
-
-        return (2.0*(ancestors1[root]-ancestors1[lcs])/(ancestors1[root] + ancestors2[root]))
-    
-    elif sense1.pos() == sense2.pos() and sense1.pos() == 'VERB':
-        
-        dummy_root =Synset(0, None, None, None, None, None)
-        ancestors1[dummy_root.synset_id()] = sys.maxsize
-        ancestors2[dummy_root.synset_id()] = sys.maxsize
-        
-        while queue1:
-            x = queue1.pop()
-            if not x.hypernymy():
-                ancestors1[dummy_root.synset_id()] = min(ancestors1[x.synset_id()] + 1,ancestors1[dummy_root.synset_id()])
+
+def similarity_lch(sense1, sense2):
+    if _stats_enabled:
+        _count_call('similarity_lch')
+    return _similarity('lch', sense1, sense2)
+
+
+def similarity_res(sense1, sense2):
+    '''Resnik similarity, the information content of the most informative common subsumer.'''
+    if _stats_enabled:
+        _count_call('similarity_res')
+    return _similarity('res', sense1, sense2)
+
+
+def similarity_lin(sense1, sense2):
+    '''Lin similarity, 2 * IC(subsumer) / (IC(sense1) + IC(sense2)).'''
+    if _stats_enabled:
+        _count_call('similarity_lin')
+    return _similarity('lin', sense1, sense2)
+
+
+def similarity_jcn(sense1, sense2):
+    '''Jiang-Conrath similarity, 1 / (IC(sense1) + IC(sense2) - 2 * IC(subsumer)).'''
+    if _stats_enabled:
+        _count_call('similarity_jcn')
+    return _similarity('jcn', sense1, sense2)
+
+
+SIMILARITY_MEASURES = {'path': similarity_path, 'wup': similarity_wup, 'lch': similarity_lch,
+                       'res': similarity_res, 'lin': similarity_lin, 'jcn': similarity_jcn}
+
+
+def similarity_matrix(senses_a, senses_b, measure='path'):
+    '''Score every pair of senses_a x senses_b with the path, wup or lch measure.
+
+    Returns a len(senses_a) x len(senses_b) numpy array, pairs the measure does
+    not cover (different or unsupported pos, no shared root) are NaN.
+    '''
+    if _stats_enabled:
+        _count_call('similarity_matrix')
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError('similarity_matrix() requires numpy') from None
+    if measure not in _MEASURE_SCORES:
+        raise IndoWordNetError('Unknown similarity measure {!r}, expected one of {}.'.format(measure, sorted(_MEASURE_SCORES)))
+
+    senses_a, senses_b = list(senses_a), list(senses_b)
+    scores = np.full((len(senses_a), len(senses_b)), np.nan)
+    unreachable = 1 << 20
+    for pos, root in HYPERNYM_ROOTS.items():
+        if measure == 'lch' and pos != 'NOUN':
+            continue
+        rows = [i for i, ss in enumerate(senses_a) if ss.pos() == pos]
+        cols = [j for j, ss in enumerate(senses_b) if ss.pos() == pos]
+        if not rows or not cols:
+            continue
+
+        # dense depth matrices over the union of ancestors, unreachable where a sense lacks the ancestor
+        maps_a = [senses_a[i]._wordnet._ancestors(pos, senses_a[i].synset_id()) for i in rows]
+        maps_b = [senses_b[j]._wordnet._ancestors(pos, senses_b[j].synset_id()) for j in cols]
+        columns = {}
+        for ancestors in maps_a + maps_b:
+            for item in ancestors:
+                columns.setdefault(item, len(columns))
+        depths_a = np.full((len(rows), len(columns)), unreachable, dtype=np.int32)
+        depths_b = np.full((len(cols), len(columns)), unreachable, dtype=np.int32)
+        for depths, maps in ((depths_a, maps_a), (depths_b, maps_b)):
+            for k, ancestors in enumerate(maps):
+                depths[k, [columns[item] for item in ancestors]] = list(ancestors.values())
+        if root in columns:
+            root_a = depths_a[:, columns[root]][:, None]
+            root_b = depths_b[:, columns[root]][None, :]
+        else:
+            root_a = np.full((len(rows), 1), unreachable)
+            root_b = np.full((1, len(cols)), unreachable)
+
+        # pairs are scored a block of rows at a time to bound the (rows, cols, ancestors) temporary
+        block = max(1, (1 << 22) // (len(cols) * len(columns)))
+        for start in range(0, len(rows), block):
+            stop = min(start + block, len(rows))
+            part_a = depths_a[start:stop, None, :]
+            distance = part_a + depths_b[None, :, :]
+            min_dist = distance.min(axis=2)
+            common = min_dist < unreachable
+            out = np.full(min_dist.shape, np.nan)
+            if measure == 'path':
+                out[common] = 1.0 / (min_dist[common] + 1)
+                out[~common] = 1.0 / (sys.maxsize - 1)
             else:
-                for parent in x.hypernymy():
-                    queue1.append(parent)
-                    if parent.synset_id() not in ancestors1:
-                        ancestors1[parent.synset_id()] = ancestors1[x.synset_id()] + 1
-                    else:
-                        ancestors1[parent.synset_id()] = min(
-                            ancestors1[parent.synset_id()], ancestors1[x.synset_id()] + 1)
- 
-        while queue2:
-            x = queue2.pop()
-            if not x.hypernymy():
-                ancestors2[dummy_root.synset_id()] = min(ancestors2[x.synset_id()] + 1,ancestors2[dummy_root.synset_id()])
+                r1 = np.broadcast_to(root_a[start:stop], min_dist.shape)
+                r2 = np.broadcast_to(root_b, min_dist.shape)
+                valid = common & (r1 < unreachable) & (r2 < unreachable)
+                if measure == 'wup':
+                    # ties on the path length go to the deeper subsumer, as in similarity_wup
+                    lcs_depth = np.where(distance == min_dist[:, :, None], part_a, unreachable).min(axis=2)
+                    out[valid] = 2.0 * (r1[valid] - lcs_depth[valid]) / (r1[valid] + r2[valid] + 2)
+                else:
+                    out[valid] = -np.log10((min_dist[valid] + 1) / (2.0 * (np.maximum(r1[valid], r2[valid]) + 1)))
+            scores[np.ix_(rows[start:stop], cols)] = out
+    return scores
+
+
+# compiled ancestor index shared with all-pairs worker processes through mmap
+# layout (native byte order, all integers uint32):
+#   magic (8 bytes) | synset count n | ancestor entry count m
+#   synset ids, sorted          n entries
+#   entry offsets             n+1 entries, ancestors of synset i are entries offsets[i] .. offsets[i+1]
+#   ancestor ids                m entries
+#   ancestor depths             m entries
+_ANCESTORS_MAGIC = b'WNGUJAI1'
+_ANCESTORS_HEADER = struct.Struct('=8sII')
+
+# (ids, offsets, ancestor ids, depths) views into the mapped ancestor index, set once per worker process
+_worker_ancestors = None
+
+
+def _write_ancestor_index(filename, ancestor_maps):
+    ids = array('I', sorted(ancestor_maps))
+    offsets, ancestor_ids, depths = array('I', [0]), array('I'), array('I')
+    for synset_id in ids:
+        ancestors = ancestor_maps[synset_id]
+        ancestor_ids.extend(ancestors.keys())
+        depths.extend(ancestors.values())
+        offsets.append(len(ancestor_ids))
+    with open(filename, 'wb') as outfile:
+        outfile.write(_ANCESTORS_HEADER.pack(_ANCESTORS_MAGIC, len(ids), len(ancestor_ids)))
+        for table in (ids, offsets, ancestor_ids, depths):
+            table.tofile(outfile)
+
+
+def _all_pairs_worker_init(filename):
+    # views into the mapped index, every worker reads the same pages and copies none of it
+    global _worker_ancestors
+    with open(filename, 'rb') as infile:
+        mapped = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, n, m = _ANCESTORS_HEADER.unpack_from(mapped)
+    if magic != _ANCESTORS_MAGIC:
+        raise IndoWordNetError('{} is not an ancestor index.'.format(filename))
+    view = memoryview(mapped)[_ANCESTORS_HEADER.size:]
+    ids = view[:4 * n].cast('I')
+    offsets = view[4 * n:4 * (2 * n + 1)].cast('I')
+    ancestor_ids = view[4 * (2 * n + 1):4 * (2 * n + 1 + m)].cast('I')
+    depths = view[4 * (2 * n + 1 + m):4 * (2 * n + 1 + 2 * m)].cast('I')
+    _worker_ancestors = (ids, offsets, ancestor_ids, depths)
+
+
+def _all_pairs_tile(start, stop, measure, pos, k, filename):
+    score = _MEASURE_SCORES[measure][0]
+    root = HYPERNYM_ROOTS[pos]
+    ids, offsets, ancestor_ids, depths = _worker_ancestors
+
+    def ancestors(i):
+        return dict(zip(ancestor_ids[offsets[i]:offsets[i + 1]], depths[offsets[i]:offsets[i + 1]]))
+
+    # the tile's rows are held as maps, every other synset is read from the index once per tile
+    rows = [(ids[i], ancestors(i)) for i in range(start, stop)]
+    tops = [[] for _ in rows]
+    for j in range(len(ids)):
+        other_id, other = ids[j], ancestors(j)
+        for (synset_id, row), top in zip(rows, tops):
+            if other_id != synset_id:
+                value = score(row, other, root)
+                if value is not None:
+                    if len(top) < k:
+                        heapq.heappush(top, (value, other_id))
+                    elif (value, other_id) > top[0]:
+                        heapq.heapreplace(top, (value, other_id))
+    with open(filename + '.tmp', 'w', encoding='utf8') as outfile:
+        for (synset_id, _), top in zip(rows, tops):
+            top.sort(reverse=True)
+            outfile.write('{}\t{}\n'.format(synset_id, ' '.join('{}:{!r}'.format(i, v) for v, i in top)))
+    # a tile only counts as done once its file is complete
+    os.replace(filename + '.tmp', filename)
+    return filename
+
+
+# (synset_id tokens, indptr, indices) of the walk graph, set once per worker process
+_worker_graph = None
+
+
+def _walks_worker_init(synset_ids, indptr, indices):
+    global _worker_graph
+    _worker_graph = ([str(synset_id) for synset_id in synset_ids], indptr, indices)
+
+
+def _walks_batch(starts, seed, walk_length, p, q):
+    tokens, indptr, indices = _worker_graph
+    rnd = random.Random(seed).random
+    uniform = p == 1 and q == 1
+    # a step is drawn uniformly and kept with probability weight / the largest weight
+    bound = max(1 / p, 1.0, 1 / q)
+    back, out = 1 / p / bound, 1 / q / bound
+    lines = []
+    for start in starts:
+        walk = [start]
+        previous = None
+        current = start
+        while len(walk) < walk_length:
+            lo, hi = indptr[current], indptr[current + 1]
+            if lo == hi:
+                break
+            if uniform or previous is None:
+                following = indices[lo + int(rnd() * (hi - lo))]
             else:
-                for parent in x.hypernymy():
-                    queue2.append(parent)
-                    if parent.synset_id() not in ancestors2:
-                        ancestors2[parent.synset_id()] = ancestors2[x.synset_id()] + 1
+                first, last = indptr[previous], indptr[previous + 1]
+                while True:
+                    following = indices[lo + int(rnd() * (hi - lo))]
+                    if following == previous:
+                        accept = back
                     else:
-                        ancestors2[parent.synset_id()] = min(
-                            ancestors2[parent.synset_id()], ancestors2[x.synset_id()] + 1)
-
-        min_dist = sys.maxsize
-        root = dummy_root.synset_id()
-        lcs = None
-        for item in ancestors1.keys():
-            if item in ancestors2:
-                if (ancestors1[item]+ancestors2[item]) < min_dist:
-                    lcs = item
-                    min_dist = (ancestors1[item]+ancestors2[item])
-       
-        
-        return (2.0*(ancestors1[root]-ancestors1[lcs])/(ancestors1[root] + ancestors2[root]))
-
-
-def similarity_lch(sense1, sense2):
-    ancestors1 = {sense1.synset_id(): 1}
-    ancestors2 = {sense2.synset_id(): 1}
-
-    queue1 = [sense1]
-    queue2 = [sense2]
-    
-    if sense1.pos() == sense2.pos() and sense1.pos() == 'NOUN':
-        root = 73
-        while queue1:
-            x = queue1.pop()
-            for parent in x.hypernymy():
-                queue1.append(parent)
-                if parent.synset_id() not in ancestors1:
-                    ancestors1[parent.synset_id()] = ancestors1[x.synset_id()] + 1
+                        j = bisect.bisect_left(indices, following, first, last)
+                        accept = 1 / bound if j < last and indices[j] == following else out
+                    if rnd() < accept:
+                        break
+            walk.append(following)
+            previous, current = current, following
+        lines.append(' '.join([tokens[i] for i in walk]) + '\n')
+    return lines
+
+
+# lookup server
+
+DEFAULT_PORT = 8765
+DEFAULT_BATCH_WINDOW = 0.002
+# upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, float('inf'))
+
+_SERVER_RELATIONS = ('hypernymy', 'hyponymy', 'entailment', 'troponymy', 'antonymy', 'meronymy', 'holonymy')
+_HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class _HTTPError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _synset_json(ss):
+    return {'id': ss.synset_id(), 'head_word': ss.head_word(), 'pos': ss.pos(), 'lemmas': ss.lemma_names(),
+            'gloss': ss.gloss(), 'examples': ss.examples()}
+
+
+class LookupServer:
+    '''HTTP/JSON server over a GujaratiWordNet handle.
+
+    GET endpoints, parameters in the query string:
+        /synsets?word=...[&pos=...]
+        /synset?id=...
+        /relations?id=...&relation=hypernymy
+        /similarity?a=<synset id>&b=<synset id>[&measure=wup]
+        /similarity?word1=...&word2=...[&measure=wup][&pos=...]
+        /stats
+
+    Indexes are loaded once on start and stay warm. Identical requests in flight
+    at the same time share one result. Relation and similarity requests arriving
+    within batch_window seconds of each other run together in a single executor
+    call, so the event loop never blocks on the data files.
+    '''
+
+    def __init__(self, wordnet=None, host='127.0.0.1', port=DEFAULT_PORT, batch_window=DEFAULT_BATCH_WINDOW):
+        self._wordnet = wordnet if wordnet is not None else _wordnet()
+        self.host = host
+        self.port = port
+        self.batch_window = batch_window
+        self._server = None
+        self._batcher = None
+        self._queue = None
+        # (path, sorted query) -> future of the in-flight request
+        self._in_flight = {}
+        # endpoint -> [count, total ms, bucket counts]
+        self._latency = {}
+        self.coalesced = 0
+        self.batches = 0
+
+    async def start(self):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        wordnet = self._wordnet
+        await loop.run_in_executor(None, lambda: (wordnet._words(), wordnet._store()))
+        self._queue = asyncio.Queue()
+        self._batcher = loop.create_task(self._run_batches())
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        # port 0 binds an ephemeral port, report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._batcher is not None:
+            self._batcher.cancel()
+            self._batcher = None
+
+    def stats(self):
+        endpoints = {}
+        for endpoint, (count, total, buckets) in self._latency.items():
+            endpoints[endpoint] = {
+                'count': count,
+                'mean_ms': total / count,
+                'buckets': [['+Inf' if bound == float('inf') else bound, n] for bound, n in zip(LATENCY_BUCKETS, buckets)],
+            }
+        return {'endpoints': endpoints, 'coalesced': self.coalesced, 'batches': self.batches,
+                'in_flight': len(self._in_flight), 'library': stats()}
+
+    def _record_latency(self, endpoint, elapsed_ms):
+        entry = self._latency.get(endpoint)
+        if entry is None:
+            entry = self._latency[endpoint] = [0, 0.0, [0] * len(LATENCY_BUCKETS)]
+        entry[0] += 1
+        entry[1] += elapsed_ms
+        entry[2][bisect.bisect_left(LATENCY_BUCKETS, elapsed_ms)] += 1
+
+    async def _handle_connection(self, reader, writer):
+        import asyncio
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length') or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # the body cannot be skipped without its length, answer and drop the connection
+                    status, body, keep_alive = 400, {'error': 'Malformed Content-Length header.'}, False
                 else:
-                    ancestors1[parent.synset_id()] = min(
-                        ancestors1[parent.synset_id()], ancestors1[x.synset_id()] + 1)
-
-        while queue2:
-            x = queue2.pop()
-            for parent in x.hypernymy():
-                queue2.append(parent)
-                if parent.synset_id() not in ancestors2:
-                    ancestors2[parent.synset_id()] = ancestors2[x.synset_id()] + 1
+                    if length:
+                        await reader.readexactly(length)
+                    parts = request_line.decode('latin-1').split()
+                    keep_alive = (len(parts) == 3 and parts[2] == 'HTTP/1.1'
+                                  and headers.get('connection', '').lower() != 'close')
+                    status, body = await self._respond(parts)
+                payload = json.dumps(body, ensure_ascii=False).encode('utf8')
+                writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json; charset=utf-8\r\n'
+                             'Content-Length: {}\r\nConnection: {}\r\n\r\n'.format(
+                                 status, _HTTP_REASONS[status], len(payload),
+                                 'keep-alive' if keep_alive else 'close').encode('latin-1'))
+                writer.write(payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, parts):
+        from urllib.parse import urlsplit, parse_qsl
+        import asyncio
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        if len(parts) < 2:
+            return 400, {'error': 'Malformed request line.'}
+        url = urlsplit(parts[1])
+        endpoint = url.path.rstrip('/') or '/'
+        try:
+            if parts[0] != 'GET':
+                raise _HTTPError(405, 'Only GET is supported.')
+            query = dict(parse_qsl(url.query))
+            if endpoint == '/stats':
+                result = self.stats()
+            else:
+                key = (endpoint, tuple(sorted(query.items())))
+                future = self._in_flight.get(key)
+                if future is not None:
+                    self.coalesced += 1
+                    result = await asyncio.shield(future)
                 else:
-                    ancestors2[parent.synset_id()] = min(
-                        ancestors2[parent.synset_id()], ancestors2[x.synset_id()] + 1)
+                    future = self._in_flight[key] = loop.create_future()
+                    try:
+                        result = await self._dispatch(endpoint, query)
+                        future.set_result(result)
+                    except Exception as error:
+                        future.set_exception(error)
+                        # consumed here, waiters that coalesced onto it re-raise it themselves
+                        future.exception()
+                        raise
+                    finally:
+                        del self._in_flight[key]
+            status = 200
+        except _HTTPError as error:
+            status, result = error.status, {'error': str(error)}
+        except (IndoWordNetError, ValueError) as error:
+            status, result = 400, {'error': str(error)}
+        except KeyError as error:
+            status, result = 404, {'error': 'Not found: {}'.format(error.args[0] if error.args else '')}
+        except Exception as error:
+            status, result = 500, {'error': '{}: {}'.format(type(error).__name__, error)}
+        self._record_latency(endpoint, (loop.time() - started) * 1000)
+        return status, result
+
+    async def _dispatch(self, endpoint, query):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        wordnet = self._wordnet
+        if endpoint == '/synsets':
+            word = _required(query, 'word')
+            return await loop.run_in_executor(
+                None, lambda: [_synset_json(ss) for ss in wordnet.synsets(word, query.get('pos'))])
+        if endpoint == '/synset':
+            synset_id = int(_required(query, 'id'))
+            return await loop.run_in_executor(None, lambda: _synset_json(self._lookup(synset_id)))
+        if endpoint == '/relations':
+            synset_id = int(_required(query, 'id'))
+            relation = _required(query, 'relation')
+            if relation not in _SERVER_RELATIONS:
+                raise _HTTPError(400, 'Unknown relation {!r}, expected one of {}.'.format(relation, list(_SERVER_RELATIONS)))
+            return await self._batched(self._relations_job, synset_id, relation)
+        if endpoint == '/similarity':
+            measure = query.get('measure', 'wup')
+            if measure not in SIMILARITY_MEASURES:
+                raise _HTTPError(400, 'Unknown similarity measure {!r}, expected one of {}.'.format(measure, sorted(SIMILARITY_MEASURES)))
+            if 'a' in query or 'b' in query:
+                return await self._batched(self._similarity_job, measure, int(_required(query, 'a')), int(_required(query, 'b')))
+            return await self._batched(self._word_similarity_job, measure, _required(query, 'word1'),
+                                       _required(query, 'word2'), query.get('pos'))
+        raise _HTTPError(404, 'Unknown endpoint {}.'.format(endpoint))
+
+    def _lookup(self, synset_id):
+        ss = self._wordnet._make_synset(synset_id)
+        if ss is None:
+            raise KeyError(synset_id)
+        return ss
+
+    def _relations_job(self, synset_id, relation):
+        return [_synset_json(ss) for ss in getattr(self._lookup(synset_id), relation)()]
+
+    def _similarity_job(self, measure, synset_id1, synset_id2):
+        return {'score': self._wordnet._pair_similarity(measure, self._lookup(synset_id1), self._lookup(synset_id2))}
+
+    def _word_similarity_job(self, measure, word1, word2, pos):
+        best = self._wordnet.word_similarity(word1, word2, measure, pos)
+        if best is None:
+            return {'score': None}
+        return {'score': best[0], 'sense1': _synset_json(best[1]), 'sense2': _synset_json(best[2])}
+
+    async def _batched(self, job, *args):
+        import asyncio
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((job, args, future))
+        return await future
+
+    async def _run_batches(self):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while True:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self.batches += 1
+            outcomes = await loop.run_in_executor(None, _run_batch, [(job, args) for job, args, _ in batch])
+            for (_, _, future), (ok, value) in zip(batch, outcomes):
+                if not future.done():
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+
+
+def _run_batch(jobs):
+    outcomes = []
+    for job, args in jobs:
+        try:
+            outcomes.append((True, job(*args)))
+        except Exception as error:
+            outcomes.append((False, error))
+    return outcomes
+
+
+def _required(query, name):
+    if name not in query:
+        raise _HTTPError(400, 'Missing query parameter {!r}.'.format(name))
+    return query[name]
+
+
+def serve(data_dir='.', host='127.0.0.1', port=DEFAULT_PORT, batch_window=DEFAULT_BATCH_WINDOW, backend='files'):
+    '''Run a LookupServer over data_dir until interrupted.'''
+    import asyncio
+    server = LookupServer(GujaratiWordNet(data_dir, backend=backend), host, port, batch_window)
+
+    async def run():
+        await server.start()
+        print('Serving {} on http://{}:{}/'.format(data_dir, server.host, server.port), flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog='python -m wnguj')
+    commands = parser.add_subparsers(dest='command', required=True)
+    setup_parser = commands.add_parser('setup', help='build the indexes of a data directory')
+    setup_parser.add_argument('--data-dir', default='.')
+    setup_parser.add_argument('--force', action='store_true', help='rebuild every index')
+    setup_parser.add_argument('--database', action='store_true', help='also build the SQLite database')
+    serve_parser = commands.add_parser('serve', help='serve lookups over HTTP/JSON')
+    serve_parser.add_argument('--data-dir', default='.')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument('--batch-window', type=float, default=DEFAULT_BATCH_WINDOW,
+                              help='seconds to gather relation and similarity requests into one batch')
+    serve_parser.add_argument('--backend', choices=GujaratiWordNet.BACKENDS, default='files')
+    walks_parser = commands.add_parser('walks', help='write node2vec random walks, one line per walk')
+    walks_parser.add_argument('--data-dir', default='.')
+    walks_parser.add_argument('--output', help='file to write, standard output by default')
+    walks_parser.add_argument('--num-walks', type=int, default=10, help='walks started from every synset')
+    walks_parser.add_argument('--walk-length', type=int, default=80)
+    walks_parser.add_argument('--relations', nargs='+', default=list(WALK_RELATIONS))
+    walks_parser.add_argument('-p', type=float, default=1.0, help='return parameter')
+    walks_parser.add_argument('-q', type=float, default=1.0, help='in-out parameter')
+    walks_parser.add_argument('--seed', type=int)
+    walks_parser.add_argument('--workers', type=int)
+    args = parser.parse_args(argv)
+    if args.command == 'setup':
+        rebuilt = setup(args.data_dir, args.force, args.database)
+        print('Rebuilt {} index{}.'.format(len(rebuilt), '' if len(rebuilt) == 1 else 'es'))
+    elif args.command == 'walks':
+        walks = GujaratiWordNet(args.data_dir).random_walks(args.num_walks, args.walk_length, args.relations,
+                                                             args.p, args.q, args.seed, workers=args.workers)
+        if args.output:
+            with open(args.output, 'w', encoding='utf8') as outfile:
+                outfile.writelines(walks)
+        else:
+            sys.stdout.writelines(walks)
+    else:
+        serve(args.data_dir, args.host, args.port, args.batch_window, args.backend)
 
-        min_dist = sys.maxsize
-        for item in ancestors1.keys():
-            if item in ancestors2:
-                min_dist = min(ancestors1[item]+ancestors2[item], min_dist)
 
-        return -1.0 * math.log10((min_dist-1)/(2 * max(ancestors1[root],ancestors2[root])))
\ No newline at end of file
+if __name__ == '__main__':
+    main()